@@ -1,2 +1,2 @@
 from .app import *
-from . import categories, customers, login, logs, products, users, sales
+from . import archive, cache, categories, changes, customers, idempotency, login, logs, metrics, migrations, overview, products, reports, sales, search, stock, users
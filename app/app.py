@@ -1,19 +1,47 @@
+import atexit
 import logging
 from logging import info, warning
 import os
+import time
 
 from dotenv import load_dotenv
-from flask import Flask, request, session
+from flask import Flask, g, has_app_context, request, session
 from flask_bcrypt import Bcrypt
 import sqlite3
 
+from .pool import ConnectionPool, parse_pragmas
+from .timing import TimedConnection, TimedJSONProvider, record_timing
+
 
 load_dotenv()
 app = Flask(__name__, static_folder="../static")
 app.secret_key = os.environ.get("INVENTORY_DB_KEY", "debug_test")
+app.json = TimedJSONProvider(app)
+app.config["BCRYPT_LOG_ROUNDS"] = int(os.environ.get("INVENTORY_DB_BCRYPT_ROUNDS", 12))
 bcrypt = Bcrypt(app)
 logging.basicConfig(level=logging.INFO)
 
+pool = ConnectionPool(
+    os.environ.get(
+        "INVENTORY_DB_PATH", os.path.join(os.path.dirname(__file__), "../db.sqlite")
+    ),
+    size=int(os.environ.get("INVENTORY_DB_POOL_SIZE", 8)),
+    timeout=float(os.environ.get("INVENTORY_DB_POOL_TIMEOUT", 10)),
+    pragmas=parse_pragmas(os.environ.get("INVENTORY_DB_PRAGMAS")),
+    factory=TimedConnection,
+)
+atexit.register(pool.close)
+
+
+# Raised by request-parsing helpers; reported back as a 400
+class QueryError(Exception):
+    pass
+
+
+@app.errorhandler(QueryError)
+def query_error(e):
+    return {"message": str(e)}, 400
+
 
 # Add CORS headers to all responses
 @app.after_request
@@ -33,54 +61,23 @@ def root_page():
 
 
 def get_database():
-    db_path = os.path.join(os.path.dirname(__file__), "../db.sqlite")
-    db = sqlite3.connect(db_path)
-    db.row_factory = sqlite3.Row
-    return db
-
-
-@app.before_request
-def init_database():
-    # Only runs once
-    app.before_request_funcs[None].remove(init_database)
-
-    try:
-        info("Initializing database...")
-        with get_database() as db:
-            # Use absolute path for schema file
-            schema_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), "schema.sql"
-            )
-            info(f"Looking for schema at: {schema_path}")
-            with open(schema_path) as schema:
-                db.executescript(schema.read())
-
-            info("Schema loaded successfully")
-
-            if (
-                db.execute(
-                    """
-                    SELECT COUNT(*)
-                    FROM users
-                    WHERE users.role = 'a' OR users.username = "admin";
-                    """
-                ).fetchone()[0]
-                == 0
-            ):
-                info("No admin account exists. Creating one...")
-                db.execute(
-                    """
-                    INSERT INTO users(username, password_hash, role)
-                    VALUES ("admin", ?, 'a');
-                    """,
-                    (bcrypt.generate_password_hash("admin").decode(),),
-                )
-                info(
-                    "Please log into 'admin' with the password 'admin' and change the password."
-                )
-
-            db.commit()
-            info("Database initialization completed successfully")
-    except Exception as e:
-        logging.error(f"Database initialization failed: {e}")
-        raise
+    # Outside of a request there is nothing to return the connection to
+    if not has_app_context():
+        return pool.connect()
+
+    # Borrowed once per request and handed back to the pool on teardown
+    if "db" not in g:
+        started = time.perf_counter()
+        g.db = pool.acquire()
+        record_timing("pool", time.perf_counter() - started)
+        g.db.timing = g.timings.setdefault("db", [0.0, 0])
+
+    return g.db
+
+
+@app.teardown_appcontext
+def release_database(exception):
+    db = g.pop("db", None)
+    if db is not None:
+        db.timing = None
+        pool.release(db)
@@ -0,0 +1,193 @@
+import time
+
+import click
+
+from .app import *
+
+
+LOG_RETENTION_DAYS = int(os.environ.get("INVENTORY_DB_LOG_RETENTION_DAYS", 365))
+ARCHIVE_BATCH = 500
+OPENING_BALANCE_NOTE = "Opening balance"
+
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive.inventory_logs (
+        id INTEGER PRIMARY KEY,
+        time INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        note TEXT,
+        archived_at INTEGER NOT NULL DEFAULT (unixepoch())
+    );
+    """
+
+
+def archive_path():
+    return os.environ.get(
+        "INVENTORY_DB_ARCHIVE_PATH", os.path.splitext(pool.path)[0] + ".archive.sqlite"
+    )
+
+
+def attach_archive(db, path):
+    db.execute("ATTACH DATABASE ? AS archive;", (path,))
+    db.execute(ARCHIVE_SCHEMA)
+    db.execute(
+        """
+        CREATE INDEX IF NOT EXISTS archive.index_archived_log_product_time
+        ON inventory_logs(product_id, time);
+        """
+    )
+    db.commit()
+
+
+def copy_batch(db, cutoff, after, size):
+    # Copies the next batch of archivable logs and commits the archive on
+    # its own, so the main database is only read here. Logs tied to a sale
+    # line stay put: sales_details.log_id would otherwise be nulled.
+    rows = db.execute(
+        """
+        SELECT il.id, il.time, il.type, il.product_id, il.delta, il.note
+        FROM inventory_logs AS il
+        WHERE il.time < ? AND (il.time, il.id) > (?, ?)
+            AND NOT EXISTS (SELECT 1 FROM sales_details AS sd WHERE sd.log_id = il.id)
+            AND NOT EXISTS (SELECT 1 FROM opening_balances AS b WHERE b.log_id = il.id)
+        ORDER BY il.time, il.id
+        LIMIT ?;
+        """,
+        (cutoff, *after, size),
+    ).fetchall()
+
+    db.executemany(
+        """
+        INSERT OR REPLACE INTO archive.inventory_logs (id, time, type, product_id, delta, note)
+        VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        [tuple(row) for row in rows],
+    )
+    db.commit()
+
+    return rows
+
+
+def compact_batch(db, ids):
+    # Replaces the archived logs (and each product's previous opening
+    # balance) with one opening balance per product, without changing
+    # products.quantity; returns how many archived logs were removed
+    placeholders = ",".join("?" * len(ids))
+
+    db.execute("BEGIN IMMEDIATE;")
+    try:
+        # Only logs whose archived copy is still identical; anything edited
+        # since the copy is picked up again on the next run
+        logs = db.execute(
+            f"""
+            SELECT il.id, il.time, il.product_id, il.delta
+            FROM inventory_logs AS il
+                JOIN archive.inventory_logs AS a ON (a.id = il.id)
+            WHERE il.id IN ({placeholders})
+                AND a.time = il.time AND a.type = il.type AND a.product_id = il.product_id
+                AND a.delta = il.delta AND a.note IS il.note
+                AND NOT EXISTS (SELECT 1 FROM sales_details AS sd WHERE sd.log_id = il.id);
+            """,
+            tuple(ids),
+        ).fetchall()
+
+        if not logs:
+            db.rollback()
+            return 0
+
+        products = {log["product_id"] for log in logs}
+        previous = db.execute(
+            f"""
+            SELECT il.id, il.time, il.product_id, il.delta
+            FROM opening_balances AS b
+                JOIN inventory_logs AS il ON (il.id = b.log_id)
+            WHERE b.product_id IN ({','.join('?' * len(products))});
+            """,
+            tuple(products),
+        ).fetchall()
+
+        balances = {}
+        for log in logs + previous:
+            delta, latest = balances.get(log["product_id"], (0, log["time"]))
+            balances[log["product_id"]] = (delta + log["delta"], max(latest, log["time"]))
+
+        # Removing the negative deltas first, then adding the balances, then
+        # removing the positive deltas never takes a quantity below its
+        # final value, so quantity_check holds at every step
+        replaced = [log["id"] for log in logs + previous]
+        placeholders = ",".join("?" * len(replaced))
+        db.execute(
+            f"DELETE FROM inventory_logs WHERE delta < 0 AND id IN ({placeholders});",
+            tuple(replaced),
+        )
+
+        opening = []
+        for product_id, (delta, latest) in balances.items():
+            cursor = db.execute(
+                """
+                INSERT INTO inventory_logs (time, type, product_id, delta, note)
+                VALUES (?, 'a', ?, ?, ?);
+                """,
+                (latest, product_id, delta, OPENING_BALANCE_NOTE),
+            )
+            opening.append((product_id, cursor.lastrowid))
+
+        db.execute(
+            f"DELETE FROM inventory_logs WHERE delta >= 0 AND id IN ({placeholders});",
+            tuple(replaced),
+        )
+        db.executemany(
+            """
+            INSERT INTO opening_balances (product_id, log_id)
+            VALUES (?, ?)
+            ON CONFLICT (product_id) DO UPDATE SET log_id = excluded.log_id;
+            """,
+            opening,
+        )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    return len(logs)
+
+
+def archive_logs(db, cutoff, size=ARCHIVE_BATCH, path=None):
+    # Moves logs older than `cutoff` to the archive database one short
+    # transaction per batch; returns the number of logs archived
+    attach_archive(db, path or archive_path())
+
+    archived = 0
+    after = (-(2**63), 0)
+    try:
+        while True:
+            rows = copy_batch(db, cutoff, after, size)
+            if not rows:
+                return archived
+
+            archived += compact_batch(db, [row["id"] for row in rows])
+            after = (rows[-1]["time"], rows[-1]["id"])
+    finally:
+        db.execute("DETACH DATABASE archive;")
+
+
+@app.cli.command("archive-logs")
+@click.option(
+    "--days",
+    type=int,
+    default=LOG_RETENTION_DAYS,
+    show_default=True,
+    help="Keep logs newer than this many days in the main database.",
+)
+@click.option("--batch", type=int, default=ARCHIVE_BATCH, show_default=True, help="Logs per transaction.")
+def archive_logs_command(days, batch):
+    """Moves old inventory logs to the archive database."""
+    cutoff = int(time.time()) - days * 86400
+    db = pool.connect()
+    try:
+        archived = archive_logs(db, cutoff, batch)
+    finally:
+        db.close()
+
+    click.echo(f"Archived {archived} inventory logs to {archive_path()}.")
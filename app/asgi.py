@@ -0,0 +1,417 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import sys
+import tempfile
+import time
+
+from .app import *
+from .changes import (
+    CHANGES_POLL,
+    HEARTBEAT_SECONDS,
+    MAX_CHANGES,
+    STREAM_HEADERS,
+    STREAM_RETRY,
+    STREAM_SECONDS,
+    CursorExpired,
+    change_event,
+    expired,
+    latest_change,
+    parse_cursor,
+    parse_wait,
+    read_changes,
+    reset_event,
+    wants_stream,
+)
+from .login import privileged
+from .pagination import parse_limit
+
+
+# ASGI entry point: `uvicorn app.asgi:application`. Requests go through the
+# same Flask app, routes and `privileged` checks as under WSGI, on a thread
+# pool sized for SQLite so the event loop never blocks. The change feed is
+# served natively: idle SSE and long-poll clients wait on the event loop for
+# a single per-process poller, which alone borrows a thread (and a pooled
+# connection) each tick.
+
+
+ASGI_THREADS = int(os.environ.get("INVENTORY_DB_ASGI_THREADS", pool.size * 2))
+BODY_IN_MEMORY = 1024 * 1024
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="sqlite")
+
+
+class Disconnected(Exception):
+    pass
+
+
+async def run_blocking(context, func, *args):
+    # Every step of a request runs in the request's own contextvars context,
+    # so Flask's request and app contexts survive hopping between threads
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, context.run, func, *args
+    )
+
+
+async def read_body(receive):
+    # Spooled to disk past 1 MiB so bulk imports are not held in memory
+    body = tempfile.SpooledTemporaryFile(max_size=BODY_IN_MEMORY)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            raise Disconnected()
+
+        body.write(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+
+    body.seek(0)
+    return body
+
+
+def build_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1")
+        value = value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name == "content-length":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+
+def encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+def start_wsgi(environ):
+    # Runs the Flask app up to its first body chunk
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = headers
+        return lambda data: None
+
+    result = app(environ, start_response)
+    chunks = iter(result)
+    first = next(chunks, None)
+    return started, result, chunks, first
+
+
+async def serve_wsgi(scope, receive, send, context, environ):
+    started, result, chunks, chunk = await run_blocking(context, start_wsgi, environ)
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": started["status"],
+                "headers": encode_headers(started["headers"]),
+            }
+        )
+
+        # Streamed bodies (exports) are pulled one chunk per executor hop
+        while chunk is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await run_blocking(context, next, chunks, None)
+
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(result, "close"):
+            await run_blocking(context, result.close)
+
+
+async def send_response(send, response):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": encode_headers(response.headers.items()),
+        }
+    )
+    await send({"type": "http.response.body", "body": response.get_data()})
+
+
+def open_feed(environ):
+    # Authorizes and parses a change feed request the way the view does;
+    # returns either a finished response or the feed parameters
+    with app.request_context(environ):
+        try:
+            denied = privileged("r")(lambda: None)()
+            if denied is not None:
+                return app.process_response(app.make_response(denied)), None
+
+            stream = wants_stream()
+            options = {"after": parse_cursor(), "stream": stream}
+            if not stream:
+                options["wait"] = parse_wait()
+                options["limit"] = parse_limit()
+        except QueryError as e:
+            return app.process_response(app.make_response(query_error(e))), None
+
+        # Carries the CORS headers added by after_request
+        headers = app.response_class(
+            mimetype="text/event-stream" if stream else "application/json",
+            headers=STREAM_HEADERS if stream else {},
+        )
+        return app.process_response(headers), options
+
+
+def poll(func, *args):
+    with app.app_context():
+        return func(*args)
+
+
+class ChangeFeed:
+    # One poller per process reads new changes once per CHANGES_POLL and
+    # wakes the subscribers, which are served from its buffer. Idle clients
+    # cost nothing per tick however many are connected; only clients behind
+    # the buffer read the changes table themselves.
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+        self.context = contextvars.Context()
+        self.reset(None)
+
+    def reset(self, cursor):
+        # The buffer holds every change in (floor, cursor]
+        self.cursor = cursor
+        self.floor = cursor
+        self.recent = deque()
+
+    def subscribe(self, wake):
+        self.subscribers.add(wake)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def unsubscribe(self, wake):
+        self.subscribers.discard(wake)
+
+    def notify(self):
+        for wake in self.subscribers:
+            wake.set()
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                try:
+                    full = await self.poll()
+                except Exception as e:
+                    warning(f"Change feed poll failed: {e}")
+                    full = False
+
+                if not full:
+                    await asyncio.sleep(CHANGES_POLL)
+        finally:
+            self.task = None
+            self.reset(None)
+
+    async def poll(self):
+        if self.cursor is None:
+            cursor = await run_blocking(self.context, poll, latest_change_now)
+            self.reset(cursor)
+            self.notify()
+            return False
+
+        try:
+            changes = await run_blocking(self.context, poll, read_changes, self.cursor)
+        except CursorExpired as e:
+            self.reset(e.cursor)
+            self.notify()
+            return False
+
+        if changes:
+            self.recent.extend(changes)
+            while len(self.recent) > MAX_CHANGES:
+                self.floor = self.recent.popleft()["id"]
+            self.cursor = changes[-1]["id"]
+            self.notify()
+
+        # A full batch means there is more to read right away
+        return len(changes) == MAX_CHANGES
+
+    async def read(self, context, after, limit):
+        if self.cursor is not None and after >= self.floor:
+            return [change for change in self.recent if change["id"] > after][:limit]
+
+        # Behind the buffer, or before the first poll
+        return await run_blocking(context, poll, read_changes, after, limit)
+
+
+feed = ChangeFeed()
+
+
+def latest_change_now():
+    try:
+        return latest_change(get_database())
+    finally:
+        release_database(None)
+
+
+async def watch_disconnect(receive, disconnected, wake):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+    disconnected.set()
+    wake.set()
+
+
+async def serve_changes(scope, receive, send, context, environ):
+    response, options = await run_blocking(context, open_feed, environ)
+    if options is None:
+        await send_response(send, response)
+        return
+
+    disconnected = asyncio.Event()
+    wake = asyncio.Event()
+    watcher = asyncio.create_task(watch_disconnect(receive, disconnected, wake))
+    feed.subscribe(wake)
+    try:
+        if options["stream"]:
+            await stream_feed(send, context, response, options, wake, disconnected)
+        else:
+            await long_poll_feed(send, context, response, options, wake, disconnected)
+    finally:
+        feed.unsubscribe(wake)
+        watcher.cancel()
+
+
+async def wait_for_wake(wake, disconnected, until):
+    # Sleeps until the feed has news, the client leaves or `until` passes
+    try:
+        await asyncio.wait_for(wake.wait(), max(0, until - time.monotonic()))
+    except asyncio.TimeoutError:
+        pass
+
+    wake.clear()
+    return disconnected.is_set()
+
+
+async def send_event(send, event):
+    await send({"type": "http.response.body", "body": event.encode(), "more_body": True})
+
+
+async def stream_feed(send, context, response, options, wake, disconnected):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": encode_headers(response.headers.items()),
+        }
+    )
+    await send_event(send, STREAM_RETRY)
+
+    # Same events, reconnects and heartbeats as `stream_changes`
+    after = options["after"]
+    deadline = time.monotonic() + STREAM_SECONDS
+    heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            changes = await feed.read(context, after, MAX_CHANGES)
+        except CursorExpired as e:
+            after = e.cursor
+            await send_event(send, reset_event(after))
+            continue
+
+        for change in changes:
+            await send_event(send, change_event(change))
+        if changes:
+            after = changes[-1]["id"]
+            heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+            continue
+
+        if time.monotonic() >= heartbeat:
+            await send_event(send, ": heartbeat\n\n")
+            heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+
+        if await wait_for_wake(wake, disconnected, min(heartbeat, deadline)):
+            return
+
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def long_poll_feed(send, context, response, options, wake, disconnected):
+    after = options["after"]
+    deadline = time.monotonic() + options["wait"]
+    while True:
+        try:
+            changes = await feed.read(context, after, options["limit"])
+        except CursorExpired as e:
+            body, status = expired(e.cursor)
+            response.status_code = status
+            break
+
+        if changes or time.monotonic() >= deadline:
+            body = {"changes": changes, "cursor": changes[-1]["id"] if changes else after}
+            break
+
+        if await wait_for_wake(wake, disconnected, deadline):
+            return
+
+    response.set_data(app.json.dumps(body))
+    await send_response(send, response)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False)
+            pool.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    if scope["type"] != "http":
+        raise RuntimeError(f"Unsupported ASGI scope: {scope['type']}")
+
+    try:
+        body = await read_body(receive)
+    except Disconnected:
+        return
+
+    context = contextvars.copy_context()
+    environ = build_environ(scope, body)
+    try:
+        if scope["path"] == "/api/changes" and scope["method"] == "GET":
+            await serve_changes(scope, receive, send, context, environ)
+        else:
+            await serve_wsgi(scope, receive, send, context, environ)
+    finally:
+        body.close()
@@ -0,0 +1,70 @@
+from collections import Counter, OrderedDict
+import threading
+import time
+
+from .app import *
+from .login import privileged
+
+
+CACHE_SIZE = int(os.environ.get("INVENTORY_DB_CACHE_SIZE", 1024))
+CACHE_TTL = float(os.environ.get("INVENTORY_DB_CACHE_TTL", 300))
+
+# Response bodies keyed by ETag: {etag: (expires, mimetype, body)}. An ETag
+# covers the request path and the versions of the tables the response read,
+# so any write (in any process) moves readers to a new key and stale
+# entries simply age out of the LRU.
+entries = OrderedDict()
+lock = threading.Lock()
+stats = Counter()
+
+
+def cache_get(endpoint, key):
+    now = time.monotonic()
+    with lock:
+        entry = entries.get(key)
+        if entry is not None and entry[0] < now:
+            del entries[key]
+            entry = None
+
+        if entry is None:
+            stats[endpoint, "misses"] += 1
+            return None
+
+        entries.move_to_end(key)
+        stats[endpoint, "hits"] += 1
+        return entry[1:]
+
+
+def cache_put(key, mimetype, body):
+    if CACHE_SIZE <= 0:
+        return
+
+    with lock:
+        entries[key] = (time.monotonic() + CACHE_TTL, mimetype, body)
+        entries.move_to_end(key)
+        while len(entries) > CACHE_SIZE:
+            entries.popitem(last=False)
+
+
+@app.get("/api/cache")
+@privileged("a")
+def get_cache_stats():
+    with lock:
+        size = len(entries)
+        counts = dict(stats)
+
+    endpoints = {}
+    for (endpoint, kind), count in counts.items():
+        endpoints.setdefault(endpoint, {"hits": 0, "misses": 0})[kind] = count
+
+    hits = sum(endpoint["hits"] for endpoint in endpoints.values())
+    misses = sum(endpoint["misses"] for endpoint in endpoints.values())
+    return {
+        "entries": size,
+        "max_entries": CACHE_SIZE,
+        "ttl": CACHE_TTL,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else None,
+        "endpoints": endpoints,
+    }
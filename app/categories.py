@@ -1,23 +1,40 @@
 from .app import *
+from .etags import conditional
 from .login import privileged
+from .lookup import lookup, requested_ids
+from .pagination import fetch_page, parse_fields
+
+
+CATEGORY_COLUMNS = ("id", "name", "description")
 
 
 @app.get("/api/categories")
 @privileged("r")
+@conditional("categories", cache=True)
 def get_categories():
+    fields = parse_fields(CATEGORY_COLUMNS)
     with get_database() as db:
-        rows = db.execute(
-            """
-            SELECT id, name, description
-            FROM categories;
-            """
-        ).fetchall()
+        if "ids" in request.args:
+            return lookup(db, "categories", fields, requested_ids())
 
-    return [dict(row) for row in rows]
+        return fetch_page(
+            db,
+            f"SELECT {', '.join(fields)} FROM categories",
+            sorts={"name": str},
+        )
+
+
+@app.post("/api/categories/lookup")
+@privileged("r")
+def lookup_categories():
+    fields = parse_fields(CATEGORY_COLUMNS)
+    with get_database() as db:
+        return lookup(db, "categories", fields, requested_ids())
 
 
 @app.get("/api/categories/<int:category_id>")
 @privileged("r")
+@conditional("categories", cache=True)
 def get_category(category_id):
     with get_database() as db:
         row = db.execute(
@@ -0,0 +1,195 @@
+import json
+import time
+
+from flask import Response, stream_with_context
+
+from .app import *
+from .login import privileged
+from .pagination import parse_limit
+
+
+CHANGES_POLL = float(os.environ.get("INVENTORY_DB_CHANGES_POLL", 0.5))
+MAX_CHANGES = 1000
+MAX_WAIT = 30
+STREAM_SECONDS = 300
+HEARTBEAT_SECONDS = 15
+
+# Current state sent along with each change, so clients patch their views
+# without fetching the row again
+CHANGE_COLUMNS = {
+    "products": "id, sku, active, name, price_cents, quantity, description, category_id",
+    "inventory_logs": "id, time, type, product_id, delta, note",
+    "sales": "id, time, total_cents, customer_id, user_id",
+}
+OPERATIONS = {"i": "insert", "u": "update", "d": "delete"}
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+STREAM_RETRY = "retry: 1000\n\n"
+
+
+class CursorExpired(Exception):
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+
+def latest_change(db):
+    return db.execute("SELECT COALESCE(MAX(id), 0) FROM changes;").fetchone()[0]
+
+
+def read_changes(after, limit=MAX_CHANGES):
+    # Borrows a connection per read and hands it back before the caller
+    # sleeps, so waiting clients do not pin pooled connections
+    db = get_database()
+    try:
+        oldest = db.execute("SELECT MIN(id) FROM changes;").fetchone()[0]
+        if oldest is not None and after < oldest - 1:
+            raise CursorExpired(latest_change(db))
+
+        changes = db.execute(
+            """
+            SELECT id, time, table_name, row_id, operation
+            FROM changes
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?;
+            """,
+            (after, limit),
+        ).fetchall()
+
+        ids = {}
+        for change in changes:
+            ids.setdefault(change["table_name"], set()).add(change["row_id"])
+
+        rows = {}
+        for table, row_ids in ids.items():
+            for row in db.execute(
+                f"""
+                SELECT {CHANGE_COLUMNS[table]}
+                FROM {table}
+                WHERE id IN ({','.join('?' * len(row_ids))});
+                """,
+                tuple(row_ids),
+            ):
+                rows[table, row["id"]] = dict(row)
+    finally:
+        release_database(None)
+
+    # Rows deleted since (or by) the change have no data
+    return [
+        {
+            "id": change["id"],
+            "time": change["time"],
+            "table": change["table_name"],
+            "operation": OPERATIONS[change["operation"]],
+            "row_id": change["row_id"],
+            "data": rows.get((change["table_name"], change["row_id"])),
+        }
+        for change in changes
+    ]
+
+
+def parse_cursor():
+    # EventSource resends the last event id on reconnect
+    value = request.args.get("after", request.headers.get("Last-Event-ID"))
+    if value is None or value == "":
+        try:
+            return latest_change(get_database())
+        finally:
+            release_database(None)
+
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError("Invalid cursor!")
+
+
+def change_event(change):
+    return f"id: {change['id']}\nevent: change\ndata: {json.dumps(change)}\n\n"
+
+
+def reset_event(cursor):
+    return f"id: {cursor}\nevent: reset\ndata: {json.dumps({'cursor': cursor})}\n\n"
+
+
+def stream_changes(after):
+    # Yields SSE text, or None where the WSGI view should wait CHANGES_POLL
+    # seconds (the ASGI server shares one poller between its streams).
+    # Streams end after a few minutes; EventSource reconnects on its own,
+    # which also re-checks the session.
+    yield STREAM_RETRY
+
+    deadline = time.monotonic() + STREAM_SECONDS
+    heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            changes = read_changes(after)
+        except CursorExpired as e:
+            after = e.cursor
+            yield reset_event(after)
+            continue
+
+        for change in changes:
+            yield change_event(change)
+        if changes:
+            after = changes[-1]["id"]
+            heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+            continue
+
+        if time.monotonic() >= heartbeat:
+            yield ": heartbeat\n\n"
+            heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+
+        yield None
+
+
+def sleeping(events):
+    for event in events:
+        if event is None:
+            time.sleep(CHANGES_POLL)
+        else:
+            yield event
+
+
+def wants_stream():
+    return request.accept_mimetypes.best == "text/event-stream"
+
+
+def parse_wait():
+    try:
+        return min(float(request.args.get("wait", 0)), MAX_WAIT)
+    except ValueError:
+        raise QueryError("Invalid wait time!")
+
+
+def expired(cursor):
+    return {"message": "The cursor is too old. Please reload.", "cursor": cursor}, 410
+
+
+@app.get("/api/changes")
+@privileged("r")
+def get_changes():
+    after = parse_cursor()
+
+    if wants_stream():
+        return Response(
+            stream_with_context(sleeping(stream_changes(after))),
+            mimetype="text/event-stream",
+            headers=STREAM_HEADERS,
+        )
+
+    # Long-poll fallback: waits up to `wait` seconds for the first change
+    wait = parse_wait()
+    limit = parse_limit()
+
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            changes = read_changes(after, limit)
+        except CursorExpired as e:
+            return expired(e.cursor)
+
+        if changes or time.monotonic() >= deadline:
+            break
+
+        time.sleep(CHANGES_POLL)
+
+    return {"changes": changes, "cursor": changes[-1]["id"] if changes else after}
@@ -1,23 +1,45 @@
 from .app import *
+from .etags import conditional
+from .imports import import_rows, to_str
 from .login import privileged
+from .lookup import lookup, requested_ids
+from .pagination import fetch_page, parse_fields
+
+
+CUSTOMER_COLUMNS = ("id", "name", "email", "phone", "address", "city", "state", "post_code", "country")
 
 
 @app.get("/api/customers")
 @privileged("r")
+@conditional("customers")
 def get_customers():
+    fields = parse_fields(CUSTOMER_COLUMNS)
     with get_database() as db:
-        rows = db.execute(
-            """
-            SELECT id, name, email, phone, address, city, state, post_code, country
-            FROM customers;
-            """
-        ).fetchall()
+        if "ids" in request.args:
+            return lookup(db, "customers", fields, requested_ids())
+
+        return fetch_page(
+            db,
+            f"SELECT {', '.join(fields)} FROM customers",
+            filters={
+                "city": ("city = ?", str),
+                "country": ("country = ?", str),
+            },
+            sorts={"name": str},
+        )
+
 
-    return [dict(row) for row in rows]
+@app.post("/api/customers/lookup")
+@privileged("r")
+def lookup_customers():
+    fields = parse_fields(CUSTOMER_COLUMNS)
+    with get_database() as db:
+        return lookup(db, "customers", fields, requested_ids())
 
 
 @app.get("/api/customers/<int:customer_id>")
 @privileged("r")
+@conditional("customers")
 def get_customer(customer_id):
     with get_database() as db:
         row = db.execute(
@@ -74,6 +96,44 @@ def create_customer():
     return {"message": "Customer has been created.", "id": customer_id}, 201
 
 
+def customer_error(exc):
+    if "email" in str(exc):
+        return "Invalid e-mail format!"
+    return "Invalid input or constraint violation!"
+
+
+@app.post("/api/customers/import")
+@privileged("w")
+def import_customers():
+    with get_database() as db:
+        report = import_rows(
+            db,
+            {
+                "table": "customers",
+                "key": "email",
+                # E-mails are not unique in the schema; the oldest match wins
+                "match": "id = (SELECT MIN(id) FROM customers WHERE email = ?)",
+                "fields": {
+                    column: to_str
+                    for column in (
+                        "name",
+                        "email",
+                        "phone",
+                        "address",
+                        "city",
+                        "state",
+                        "post_code",
+                        "country",
+                    )
+                },
+                "required": ["name"],
+                "error": customer_error,
+            },
+        )
+
+    return {"message": "Customers have been imported.", **report}
+
+
 @app.patch("/api/customers/<int:customer_id>")
 @privileged("w")
 def update_customer(customer_id):
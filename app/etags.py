@@ -0,0 +1,88 @@
+from functools import wraps
+import hashlib
+
+from flask import make_response
+
+from .app import *
+from .cache import cache_get, cache_put
+
+
+def table_versions(db, tables):
+    rows = db.execute(
+        f"""
+        SELECT name, version
+        FROM table_versions
+        WHERE name IN ({','.join('?' * len(tables))});
+        """,
+        tuple(tables),
+    ).fetchall()
+
+    return {row["name"]: row["version"] for row in rows}
+
+
+def shown_columns():
+    # Columns a ?fields= projection keeps (the sort column always comes
+    # along), or None for all of them
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+
+    sort = request.args.get("sort", "id").removeprefix("-")
+    return {field.strip() for field in fields.split(",")} | {sort}
+
+
+def conditional(*tables, cache=False, expand=None, columns=None, row=None):
+    # Tags GET responses with the versions of the tables they read. A request
+    # whose If-None-Match still matches gets a 304 before the view runs; with
+    # `cache`, other requests for an unchanged resource are served from memory.
+    # `expand` maps ?expand= options to the extra tables they read, `columns`
+    # maps columns to the counters behind them unless ?fields= leaves them
+    # out. `row` is a (table, key) of per-row versions that also tag
+    # responses about the single row named by the view's `key` argument.
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            read = set(tables)
+            for option in request.args.get("expand", "").split(","):
+                read.update((expand or {}).get(option.strip(), ()))
+
+            shown = shown_columns()
+            for column, extra in (columns or {}).items():
+                if shown is None or column in shown:
+                    read.update(extra)
+
+            with get_database() as db:
+                versions = table_versions(db, sorted(read))
+                if row is not None:
+                    table, key = row
+                    stamp = db.execute(
+                        f"SELECT version FROM {table} WHERE {key} = ?;", (kwargs[key],)
+                    ).fetchone()
+                    versions[table] = stamp and stamp[0]
+
+            # Read before the view, so a concurrent write can only make the
+            # tag older than the body, never newer
+            etag = hashlib.blake2b(
+                f"{request.full_path}|{sorted(versions.items())}".encode(), digest_size=12
+            ).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            elif cache and (cached := cache_get(request.endpoint, etag)):
+                mimetype, body = cached
+                response = app.response_class(body, mimetype=mimetype)
+            else:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+                if cache:
+                    cache_put(etag, response.mimetype, response.get_data())
+
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+
+from .app import *
+
+
+EXPORT_CHUNK = 1000
+
+
+def export_rows(select, name, id_column="id", time_column="time"):
+    # Streams `select` without materializing the result set. Incremental
+    # pulls pass since_id (exclusive) and/or since_time (inclusive); rows
+    # come in id order, or in time order when pulling by time so the
+    # time index drives the scan.
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in {"ndjson", "csv"}:
+        raise QueryError("The format must be either ndjson or csv!")
+
+    clauses = []
+    params = []
+    for argument, clause in (
+        ("since_id", f"{id_column} > ?"),
+        ("since_time", f"{time_column} >= ?"),
+    ):
+        value = request.args.get(argument)
+        if not value:
+            continue
+
+        try:
+            params.append(int(value))
+        except ValueError:
+            raise QueryError(f"Invalid {argument}!")
+
+        clauses.append(clause)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = id_column
+    if request.args.get("since_time"):
+        order = f"{time_column}, {id_column}"
+
+    query = f"""
+        {select}
+        {where}
+        ORDER BY {order};
+        """
+
+    def generate():
+        cursor = get_database().execute(query, tuple(params))
+        columns = [column[0] for column in cursor.description]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(columns)
+
+        while rows := cursor.fetchmany(EXPORT_CHUNK):
+            for row in rows:
+                if fmt == "csv":
+                    writer.writerow(tuple(row))
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, row))))
+                    buffer.write("\n")
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        # Only the CSV header is left over when there were no rows at all
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+        },
+    )
@@ -0,0 +1,140 @@
+from functools import wraps
+import hashlib
+import itertools
+import time
+
+from flask import make_response
+
+from .app import *
+
+
+IDEMPOTENCY_TTL = int(os.environ.get("INVENTORY_DB_IDEMPOTENCY_TTL", 86400))
+MAX_KEY_LENGTH = 255
+# Expired keys are swept on every this many claims
+SWEEP_EVERY = 100
+
+claims = itertools.count()
+
+
+# Raised inside a write unit when another request already holds the key;
+# deliberately not an sqlite3.IntegrityError, which views turn into a 400
+class KeyTaken(Exception):
+    pass
+
+
+def stored_response(db, user_id, key):
+    return db.execute(
+        """
+        SELECT fingerprint, status, body
+        FROM idempotency_keys
+        WHERE user_id = ? AND key = ? AND created > ?;
+        """,
+        (user_id, key, int(time.time()) - IDEMPOTENCY_TTL),
+    ).fetchone()
+
+
+def replay(stored, fingerprint):
+    # No row (or no response) yet means the claim is in a transaction that
+    # has not committed
+    if stored is not None and stored["fingerprint"] != fingerprint:
+        return {"message": "This Idempotency-Key was used for a different request!"}, 422
+
+    if stored is None or stored["status"] is None:
+        return {"message": "A request with this Idempotency-Key is still being processed!"}, 409, {"Retry-After": "1"}
+
+    response = app.response_class(stored["body"], status=stored["status"], mimetype="application/json")
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def claimed(func, respond):
+    # Wraps a write unit so it also claims the request's Idempotency-Key, if
+    # any, and stores the view's success response, respond(result), with it.
+    # Claim, writes and response commit or roll back together, so a key is
+    # never left claimed without a response to replay.
+    @wraps(func)
+    def unit(db, *args):
+        idempotency = g.get("idempotency")
+        if idempotency is None:
+            return func(db, *args)
+
+        now = int(time.time())
+        if next(claims) % SWEEP_EVERY == 0:
+            db.execute(
+                "DELETE FROM idempotency_keys WHERE created <= ?;",
+                (now - IDEMPOTENCY_TTL,),
+            )
+
+        # An expired claim on the same key is taken over
+        cursor = db.execute(
+            """
+            INSERT INTO idempotency_keys (user_id, key, fingerprint, created)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, key) DO UPDATE
+            SET fingerprint = excluded.fingerprint,
+                created = excluded.created,
+                status = NULL,
+                body = NULL
+            WHERE created <= ?;
+            """,
+            (*idempotency, now, now - IDEMPOTENCY_TTL),
+        )
+        if cursor.rowcount == 0:
+            raise KeyTaken()
+
+        result = func(db, *args)
+        body, status = respond(result)
+        db.execute(
+            """
+            UPDATE idempotency_keys
+            SET status = ?, body = ?
+            WHERE user_id = ? AND key = ?;
+            """,
+            (status, app.json.dumps(body), *idempotency[:2]),
+        )
+        return result
+
+    return unit
+
+
+def idempotent(func):
+    # Requests with an Idempotency-Key header run at most once per key and
+    # user within IDEMPOTENCY_TTL; retries get the stored response back.
+    # The view must do its writes through write(claimed(..., respond)) and
+    # answer a success with that same respond(result).
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return func(*args, **kwargs)
+
+        if not 1 <= len(key) <= MAX_KEY_LENGTH:
+            return {"message": f"An Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters long!"}, 400
+
+        user_id = session["user_id"]
+        fingerprint = hashlib.blake2b(
+            f"{request.method} {request.path}\n".encode() + request.get_data(), digest_size=16
+        ).hexdigest()
+
+        with get_database() as db:
+            stored = stored_response(db, user_id, key)
+        if stored is not None:
+            return replay(stored, fingerprint)
+
+        # Not held while waiting for the writer, which needs one of its own
+        release_database(None)
+
+        g.idempotency = (user_id, key, fingerprint)
+        try:
+            response = make_response(func(*args, **kwargs))
+        except KeyTaken:
+            # A concurrent request with the same key got there first
+            with get_database() as db:
+                stored = stored_response(db, user_id, key)
+            return replay(stored, fingerprint)
+
+        # Failed requests wrote nothing, the claim included, so a retry runs
+        # again; successful ones stored their response along with the writes
+        return response
+
+    return wrapper
@@ -0,0 +1,208 @@
+import csv
+import io
+import json
+
+from .app import *
+
+
+IMPORT_CHUNK = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+def to_int(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(value)
+    return int(value)
+
+
+def to_bool(value):
+    if isinstance(value, bool):
+        return int(value)
+
+    match str(value).lower():
+        case "1" | "true" | "yes":
+            return 1
+        case "0" | "false" | "no":
+            return 0
+        case _:
+            raise ValueError(value)
+
+
+def to_str(value):
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        raise ValueError(value)
+    return str(value)
+
+
+def read_upload():
+    # Yields (row number, record, error) lazily from a CSV or NDJSON upload,
+    # sent either as the multipart field `file` or as the raw request body
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+
+    fmt = request.args.get("format")
+    if fmt is None:
+        name = upload.filename if upload else ""
+        mimetype = upload.mimetype if upload else request.mimetype
+        fmt = "csv" if name.endswith(".csv") or mimetype == "text/csv" else "ndjson"
+    if fmt not in {"csv", "ndjson"}:
+        raise QueryError("The format must be either ndjson or csv!")
+
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(text), 1):
+            yield number, record, None
+        return
+
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, None, "Invalid JSON!"
+            continue
+
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, "Each line must be a JSON object!"
+
+
+def convert_record(record, fields):
+    # Keeps the provided (non-empty) columns, converted to their SQL types
+    values = {}
+    for column, convert in fields.items():
+        value = record.get(column)
+        if value is None or value == "":
+            continue
+
+        try:
+            values[column] = convert(value)
+        except ValueError:
+            raise ValueError(f"Invalid {column}!")
+
+    return values
+
+
+def import_rows(db, spec):
+    # Upserts an uploaded file into spec["table"] in chunked transactions.
+    # spec keys: table, key (upsert column), match (WHERE clause for updates,
+    # one placeholder for the key), fields ({column: converter}), required
+    # (columns needed to insert), prepare (optional record hook returning
+    # the values dict), error (maps an IntegrityError to a message).
+    report = {"inserted": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def fail(number, message):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": number, "message": message})
+
+    chunk = []
+    for number, record, error in read_upload():
+        if error:
+            fail(number, error)
+            continue
+
+        try:
+            values = convert_record(record, spec["fields"])
+            if spec.get("prepare"):
+                values = spec["prepare"](record, values)
+        except ValueError as exc:
+            fail(number, str(exc))
+            continue
+
+        chunk.append((number, values))
+        if len(chunk) >= IMPORT_CHUNK:
+            write_chunk(db, spec, chunk, report, fail)
+            chunk = []
+
+    if chunk:
+        write_chunk(db, spec, chunk, report, fail)
+
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
+
+
+def write_chunk(db, spec, chunk, report, fail):
+    table = spec["table"]
+    key = spec["key"]
+    columns = list(spec["fields"])
+
+    db.execute("BEGIN IMMEDIATE;")
+
+    keys = {values[key] for _, values in chunk if key in values}
+    existing = {
+        row[0]
+        for row in db.execute(
+            f"SELECT {key} FROM {table} WHERE {key} IN ({','.join('?' * len(keys))});",
+            tuple(keys),
+        )
+    }
+
+    # Rows whose key already exists (or appeared earlier in this chunk) are
+    # updated after the inserts; only the provided columns are overwritten
+    inserts = []
+    updates = []
+    for number, values in chunk:
+        if values.get(key) in existing:
+            updates.append((number, values))
+            continue
+
+        missing = [column for column in spec["required"] if column not in values]
+        if missing:
+            fail(number, f"A {missing[0]} is required!")
+            continue
+
+        inserts.append((number, values))
+        if key in values:
+            existing.add(values[key])
+
+    insert_sql = f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))});
+        """
+    update_sql = f"""
+        UPDATE {table}
+        SET {', '.join(f'{column} = COALESCE(?, {column})' for column in columns)}
+        WHERE {spec['match']};
+        """
+
+    def insert_params(values):
+        return tuple(values.get(column) for column in columns)
+
+    def update_params(values):
+        return insert_params(values) + (values[key],)
+
+    try:
+        db.execute("SAVEPOINT import_chunk;")
+        db.executemany(insert_sql, [insert_params(v) for _, v in inserts])
+        db.executemany(update_sql, [update_params(v) for _, v in updates])
+        db.execute("RELEASE import_chunk;")
+        report["inserted"] += len(inserts)
+        report["updated"] += len(updates)
+    except sqlite3.IntegrityError:
+        # Replay row by row so one bad row does not sink the whole chunk
+        db.execute("ROLLBACK TO import_chunk;")
+        db.execute("RELEASE import_chunk;")
+
+        for kind, sql, params, rows in (
+            ("inserted", insert_sql, insert_params, inserts),
+            ("updated", update_sql, update_params, updates),
+        ):
+            for number, values in rows:
+                db.execute("SAVEPOINT import_row;")
+                try:
+                    db.execute(sql, params(values))
+                    db.execute("RELEASE import_row;")
+                    report[kind] += 1
+                except sqlite3.IntegrityError as exc:
+                    db.execute("ROLLBACK TO import_row;")
+                    db.execute("RELEASE import_row;")
+                    fail(number, spec["error"](exc))
+
+    db.commit()
@@ -1,6 +1,14 @@
 from functools import wraps
 
 from .app import *
+from .passwords import (
+    check_password,
+    clear_login_failures,
+    hash_password,
+    login_retry_after,
+    needs_rehash,
+    record_login_failure,
+)
 
 
 @app.get("/api/me")
@@ -60,6 +68,15 @@ def login():
     if not password:
         return {"message": "A password is required!"}, 400
 
+    # Throttled usernames are turned away before any hashing happens
+    retry_after = login_retry_after(username)
+    if retry_after:
+        return (
+            {"message": "Too many failed login attempts! Please try again later."},
+            429,
+            {"Retry-After": str(retry_after)},
+        )
+
     with get_database() as db:
         user = db.execute(
             """
@@ -70,9 +87,28 @@ def login():
             (username,),
         ).fetchone()
 
-    if user is None or not bcrypt.check_password_hash(user["password_hash"], password):
+    # Handed back before hashing, so slow logins do not hold pooled connections
+    release_database(None)
+
+    if user is None or not check_password(user["password_hash"], password):
+        record_login_failure(username)
         return {"message": "Invalid credentials!"}, 401
 
+    clear_login_failures(username)
+
+    # Upgrade hashes made with a different work factor while we know the password
+    if needs_rehash(user["password_hash"]):
+        password_hash = hash_password(password)
+        with get_database() as db:
+            db.execute(
+                """
+                UPDATE users
+                SET password_hash = ?
+                WHERE id = ? AND password_hash = ?;
+                """,
+                (password_hash, user["id"], user["password_hash"]),
+            )
+
     session.clear()
     # session.regenerate()
     session["user_id"] = user["id"]
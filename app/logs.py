@@ -1,23 +1,62 @@
 from .app import *
+from .etags import conditional
+from .export import export_rows
+from .idempotency import claimed, idempotent
 from .login import privileged
+from .lookup import lookup, requested_ids
+from .pagination import fetch_page, parse_fields
+from .writer import write
+
+
+LOG_COLUMNS = ("id", "time", "type", "product_id", "delta", "note")
 
 
 @app.get("/api/logs")
 @privileged("r")
+@conditional("inventory_logs")
 def get_logs():
+    fields = parse_fields(LOG_COLUMNS, required=["time"])
     with get_database() as db:
-        rows = db.execute(
-            """
-            SELECT id, time, type, product_id, delta, note
-            FROM inventory_logs;
-            """
-        ).fetchall()
+        if "ids" in request.args:
+            return lookup(db, "inventory_logs", fields, requested_ids())
+
+        return fetch_page(
+            db,
+            f"SELECT {', '.join(fields)} FROM inventory_logs",
+            filters={
+                "product_id": ("product_id = ?", int),
+                "type": ("type = ?", str),
+                "time_from": ("time >= ?", int),
+                "time_to": ("time < ?", int),
+            },
+            sorts={"time": int},
+            filtered_sort="time",
+        )
+
+
+@app.post("/api/logs/lookup")
+@privileged("r")
+def lookup_logs():
+    fields = parse_fields(LOG_COLUMNS)
+    with get_database() as db:
+        return lookup(db, "inventory_logs", fields, requested_ids())
+
 
-    return [dict(row) for row in rows]
+@app.get("/api/logs/export")
+@privileged("r")
+def export_logs():
+    return export_rows(
+        """
+        SELECT id, time, type, product_id, delta, note
+        FROM inventory_logs
+        """,
+        "inventory_logs",
+    )
 
 
 @app.get("/api/logs/<int:log_id>")
 @privileged("r")
+@conditional("inventory_logs")
 def get_log(log_id):
     with get_database() as db:
         row = db.execute(
@@ -37,6 +76,7 @@ def get_log(log_id):
 
 @app.post("/api/logs")
 @privileged("a")
+@idempotent
 def create_log():
     data = request.get_json(force=True)
     if not data:
@@ -55,15 +95,18 @@ def create_log():
         return {"message": "A delta value is required!"}, 400
 
     try:
-        with get_database() as db:
-            cursor = db.execute(
-                """
-                INSERT INTO inventory_logs (type, product_id, delta, note)
-                VALUES (?, ?, ?, ?);
-                """,
-                (type_, product_id, delta, data.get("note")),
+        log_id = write(
+            claimed(
+                lambda db: db.execute(
+                    """
+                    INSERT INTO inventory_logs (type, product_id, delta, note)
+                    VALUES (?, ?, ?, ?);
+                    """,
+                    (type_, product_id, delta, data.get("note")),
+                ).lastrowid,
+                log_created,
             )
-            log_id = cursor.lastrowid
+        )
     except sqlite3.IntegrityError as e:
         if "product_id" in str(e):
             return {"message": "Product does not exist!"}, 400
@@ -71,6 +114,10 @@ def create_log():
             return {"message": "Invalid type!"}, 400
         return {"message": "Invalid input or constraint violation!"}, 400
 
+    return log_created(log_id)
+
+
+def log_created(log_id):
     return {"message": "Log entry has been created.", "id": log_id}, 201
 
 
@@ -0,0 +1,54 @@
+from .app import *
+
+
+# Ids per `IN (...)` list, well below SQLite's limit on bound parameters
+ID_CHUNK = 500
+# Most ids one lookup may ask for
+MAX_LOOKUP = 10000
+
+
+def fetch_by_ids(db, select, ids, column="id"):
+    # Runs `select` (a "SELECT ... FROM table" without WHERE) once per chunk
+    # of ids with `column IN (...)`; returns the rows in index order
+    ids = list(dict.fromkeys(ids))
+    rows = []
+    for start in range(0, len(ids), ID_CHUNK):
+        chunk = ids[start : start + ID_CHUNK]
+        rows += db.execute(
+            f"{select} WHERE {column} IN ({','.join('?' * len(chunk))});",
+            chunk,
+        ).fetchall()
+
+    return rows
+
+
+def rows_by_id(db, select, ids):
+    return {row["id"]: dict(row) for row in fetch_by_ids(db, select, ids)}
+
+
+def requested_ids():
+    # `?ids=1,2,3` on a list endpoint, or {"ids": [1, 2, 3]} posted to
+    # its /lookup twin for sets too long for a URL
+    if request.method == "GET":
+        values = [value for value in request.args.get("ids", "").split(",") if value.strip()]
+    else:
+        data = request.get_json(force=True)
+        values = data.get("ids") if isinstance(data, dict) else None
+        if not isinstance(values, list):
+            raise QueryError("A JSON body with a list of ids is required!")
+
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise QueryError("Invalid ids!")
+
+    if len(ids) > MAX_LOOKUP:
+        raise QueryError(f"At most {MAX_LOOKUP} ids can be looked up at once!")
+
+    return ids
+
+
+def lookup(db, table, columns, ids):
+    # Keyed by id; ids that do not exist map to null
+    rows = rows_by_id(db, f"SELECT {', '.join(columns)} FROM {table}", ids)
+    return {"items": {str(row_id): rows.get(row_id) for row_id in ids}}
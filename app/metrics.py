@@ -0,0 +1,180 @@
+import hmac
+import threading
+import time
+
+from .app import *
+from .login import privileged
+from .timing import SLOW_QUERY_MS, slow_queries, slow_queries_lock
+
+
+# Request latency histogram bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_TOKEN = os.environ.get("INVENTORY_DB_METRICS_TOKEN")
+SEGMENTS = ("db", "pool", "write", "bcrypt", "json")
+
+# Keyed by (method, route); routes are URL rules, so the label set is bounded
+routes = {}
+responses = {}
+lock = threading.Lock()
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+def server_timing(timings, total):
+    entries = []
+    for segment in SEGMENTS:
+        if segment in timings:
+            seconds, count = timings[segment]
+            entry = f"{segment};dur={seconds * 1000:.3f}"
+            if segment == "db":
+                entry += f';desc="{count} queries"'
+            entries.append(entry)
+
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def record_request(key, status, total, timings):
+    with lock:
+        stats = routes.get(key)
+        if stats is None:
+            stats = routes[key] = {
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "count": 0,
+                "sum": 0.0,
+                "segments": {segment: 0.0 for segment in SEGMENTS},
+                "queries": 0,
+            }
+
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if total <= bound:
+                stats["buckets"][i] += 1
+                break
+        stats["count"] += 1
+        stats["sum"] += total
+        for segment, (seconds, count) in timings.items():
+            stats["segments"][segment] += seconds
+            if segment == "db":
+                stats["queries"] += count
+
+        responses[key + (status,)] = responses.get(key + (status,), 0) + 1
+
+
+# Streamed exports keep reading after this runs, so their header and
+# metrics only cover the time to the first chunk
+@app.after_request
+def record_timings(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+
+    total = time.perf_counter() - started
+    timings = g.get("timings", {})
+    response.headers["Server-Timing"] = server_timing(timings, total)
+
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    record_request((request.method, route), response.status_code, total, timings)
+    return response
+
+
+def labels(**values):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in values.items()) + "}"
+
+
+def render_metrics():
+    with lock:
+        snapshot = {
+            key: {**stats, "buckets": list(stats["buckets"]), "segments": dict(stats["segments"])}
+            for key, stats in routes.items()
+        }
+        statuses = dict(responses)
+
+    lines = [
+        "# HELP inventory_request_duration_seconds Time to handle a request.",
+        "# TYPE inventory_request_duration_seconds histogram",
+    ]
+    for (method, route), stats in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+            cumulative += count
+            lines.append(
+                f"inventory_request_duration_seconds_bucket{labels(method=method, route=route, le=bound)} {cumulative}"
+            )
+        lines.append(
+            f"inventory_request_duration_seconds_bucket{labels(method=method, route=route, le='+Inf')} {stats['count']}"
+        )
+        lines.append(f"inventory_request_duration_seconds_sum{labels(method=method, route=route)} {stats['sum']}")
+        lines.append(f"inventory_request_duration_seconds_count{labels(method=method, route=route)} {stats['count']}")
+
+    lines += [
+        "# HELP inventory_request_segment_seconds_total Request time spent in SQLite, waiting for a connection, waiting for the writer, in bcrypt or encoding JSON.",
+        "# TYPE inventory_request_segment_seconds_total counter",
+    ]
+    for (method, route), stats in sorted(snapshot.items()):
+        for segment, seconds in stats["segments"].items():
+            lines.append(
+                f"inventory_request_segment_seconds_total{labels(method=method, route=route, segment=segment)} {seconds}"
+            )
+
+    lines += [
+        "# HELP inventory_db_queries_total SQL statements executed by requests.",
+        "# TYPE inventory_db_queries_total counter",
+    ]
+    for (method, route), stats in sorted(snapshot.items()):
+        lines.append(f"inventory_db_queries_total{labels(method=method, route=route)} {stats['queries']}")
+
+    lines += [
+        "# HELP inventory_responses_total Responses by status code.",
+        "# TYPE inventory_responses_total counter",
+    ]
+    for (method, route, status), count in sorted(statuses.items()):
+        lines.append(f"inventory_responses_total{labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP inventory_errors_total Responses with a 4xx or 5xx status.",
+        "# TYPE inventory_errors_total counter",
+    ]
+    for (method, route, status), count in sorted(statuses.items()):
+        if status >= 400:
+            lines.append(f"inventory_errors_total{labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP inventory_pool_connections Database connections by state.",
+        "# TYPE inventory_pool_connections gauge",
+    ]
+    stats = pool.stats()
+    for state in ("in_use", "idle"):
+        lines.append(f"inventory_pool_connections{labels(state=state)} {stats[state]}")
+    lines += [
+        "# HELP inventory_pool_size Maximum number of pooled connections.",
+        "# TYPE inventory_pool_size gauge",
+        f"inventory_pool_size {stats['size']}",
+    ]
+
+    return "\n".join(lines) + "\n"
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    # Scrapers present INVENTORY_DB_METRICS_TOKEN as a bearer token;
+    # without one configured, metrics are for admins only
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not (METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())):
+        denied = privileged("a")(lambda: None)()
+        if denied is not None:
+            return denied
+
+    return app.response_class(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.get("/api/slow-queries")
+@privileged("a")
+def get_slow_queries():
+    with slow_queries_lock:
+        queries = list(slow_queries)
+
+    # Newest first
+    return {"threshold_ms": SLOW_QUERY_MS, "queries": queries[::-1]}
@@ -0,0 +1,116 @@
+import glob
+import re
+import sqlite3
+
+import click
+
+from .app import *
+
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+
+
+def list_migrations():
+    # Version 1 is the baseline schema.sql; later versions live in
+    # migrations/NNNN_description.sql and are applied in order
+    migrations = [(1, os.path.join(ROOT, "schema.sql"))]
+    for path in sorted(glob.glob(os.path.join(ROOT, "migrations", "*.sql"))):
+        match = re.match(r"(\d+)_", os.path.basename(path))
+        if match:
+            migrations.append((int(match[1]), path))
+
+    versions = [version for version, _ in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise RuntimeError(f"Migration versions are not contiguous: {versions}")
+
+    return migrations
+
+
+def split_statements(script):
+    # Trigger bodies contain semicolons, so let SQLite decide where a
+    # statement ends
+    statements = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+
+    if buffer.strip():
+        statements.append(buffer.strip())
+
+    return statements
+
+
+def create_admin(db):
+    if db.execute(
+        """
+        SELECT COUNT(*)
+        FROM users
+        WHERE users.role = 'a' OR users.username = "admin";
+        """
+    ).fetchone()[0]:
+        return
+
+    info("No admin account exists. Creating one...")
+    db.execute(
+        """
+        INSERT INTO users(username, password_hash, role)
+        VALUES ("admin", ?, 'a');
+        """,
+        (bcrypt.generate_password_hash("admin").decode(),),
+    )
+    info("Please log into 'admin' with the password 'admin' and change the password.")
+
+
+def migrate(pool):
+    # A database that is up to date costs a single PRAGMA read
+    db = pool.connect()
+    db.isolation_level = None
+
+    try:
+        migrations = list_migrations()
+        latest = migrations[-1][0]
+        if db.execute("PRAGMA user_version;").fetchone()[0] >= latest:
+            return latest
+
+        # Workers starting together queue up on the lock; whoever gets it
+        # second sees the new version and has nothing left to do
+        db.execute("BEGIN EXCLUSIVE;")
+        try:
+            version = db.execute("PRAGMA user_version;").fetchone()[0]
+            for number, path in migrations:
+                if number <= version:
+                    continue
+
+                info(f"Applying migration {number}: {os.path.basename(path)}")
+                with open(path) as script:
+                    for statement in split_statements(script.read()):
+                        db.execute(statement)
+
+                db.execute(f"PRAGMA user_version = {number};")
+
+            if version == 0:
+                create_admin(db)
+
+            db.execute("COMMIT;")
+        except BaseException:
+            db.execute("ROLLBACK;")
+            raise
+
+        return latest
+    finally:
+        db.close()
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Applies pending schema migrations."""
+    click.echo(f"Database is at version {migrate(pool)}.")
+
+
+# Migrations run once per process at import rather than inside a request;
+# set INVENTORY_DB_MIGRATE=0 to leave them to `flask migrate`
+if os.environ.get("INVENTORY_DB_MIGRATE", "1") != "0":
+    migrate(pool)
@@ -0,0 +1,63 @@
+from .app import *
+from .login import privileged
+
+
+LOW_STOCK_THRESHOLD = int(os.environ.get("INVENTORY_DB_LOW_STOCK", 5))
+
+
+@app.get("/api/overview")
+@privileged("r")
+def get_overview():
+    try:
+        recent = int(request.args.get("recent", 5))
+        low_stock = int(request.args.get("low_stock", LOW_STOCK_THRESHOLD))
+    except ValueError:
+        return {"message": "Invalid overview parameters!"}, 400
+
+    if not 0 <= recent <= 50:
+        return {"message": "The number of recent sales must be between 0 and 50!"}, 400
+
+    with get_database() as db:
+        stats = db.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM products) AS products,
+                (SELECT COUNT(*) FROM products WHERE active = 1) AS active_products,
+                (SELECT COUNT(*) FROM users) AS users,
+                (SELECT COUNT(*) FROM categories) AS categories,
+                (SELECT COUNT(*) FROM customers) AS customers,
+                (SELECT COUNT(*) FROM sales) AS sales,
+                (
+                    SELECT COALESCE(SUM(price_cents * quantity), 0)
+                    FROM products
+                ) AS stock_value_cents,
+                (
+                    SELECT COUNT(*)
+                    FROM products
+                    WHERE active = 1 AND quantity <= ?
+                ) AS low_stock,
+                (
+                    SELECT COALESCE(SUM(total_cents), 0)
+                    FROM sales
+                    WHERE time >= unixepoch('now', 'start of day')
+                ) AS revenue_today_cents,
+                (
+                    SELECT COUNT(*)
+                    FROM sales
+                    WHERE time >= unixepoch('now', 'start of day')
+                ) AS sales_today;
+            """,
+            (low_stock,),
+        ).fetchone()
+
+        rows = db.execute(
+            """
+            SELECT id, time, total_cents, customer_id, user_id
+            FROM sales
+            ORDER BY id DESC
+            LIMIT ?;
+            """,
+            (recent,),
+        ).fetchall()
+
+    return {**dict(stats), "recent_sales": [dict(row) for row in rows]}
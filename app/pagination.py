@@ -0,0 +1,146 @@
+from .app import *
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def parse_bool(value):
+    match value.lower():
+        case "1" | "true":
+            return 1
+        case "0" | "false":
+            return 0
+        case _:
+            raise ValueError(value)
+
+
+def parse_limit(default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        limit = int(request.args.get("limit", default))
+    except ValueError:
+        raise QueryError("Invalid limit!")
+
+    if not 1 <= limit <= maximum:
+        raise QueryError(f"The limit must be between 1 and {maximum}!")
+
+    return limit
+
+
+def parse_filters(filters):
+    # filters: {argument: (SQL clause with one placeholder, converter)}
+    clauses = []
+    params = []
+
+    for name, (clause, convert) in filters.items():
+        value = request.args.get(name)
+        if value is None or value == "":
+            continue
+
+        try:
+            params.append(convert(value))
+        except ValueError:
+            raise QueryError(f"Invalid {name} filter!")
+
+        clauses.append(clause)
+
+    return clauses, params
+
+
+def parse_fields(columns, required=()):
+    # ?fields=id,name projects a list onto some of `columns`, which the caller
+    # puts in its SELECT. `id` and the sort column always come along, since
+    # cursors are built from them, as do `required` ones (such as a
+    # `filtered_sort` column); the result keeps the order of `columns`
+    value = request.args.get("fields")
+    if not value:
+        return columns
+
+    fields = {field.strip() for field in value.split(",") if field.strip()}
+    if not fields <= set(columns):
+        raise QueryError("Invalid fields!")
+
+    fields.update(("id", request.args.get("sort", "id").removeprefix("-"), *required))
+    return tuple(column for column in columns if column in fields)
+
+
+def parse_columnar():
+    # ?format=columns: {"columns": [...], "rows": [[...], ...]} instead of
+    # one object per row
+    match request.args.get("format", "objects"):
+        case "objects":
+            return False
+        case "columns":
+            return True
+        case _:
+            raise QueryError("Invalid format!")
+
+
+def fetch_page(db, select, filters=None, sorts=None, params=(), filtered_sort="id"):
+    # Keyset pagination over `select` (a "SELECT ... FROM table" without
+    # WHERE/ORDER BY, whose own placeholders are bound from `params`).
+    # `sorts` maps the extra NOT NULL columns that may be sorted on to their
+    # converters; `id` is always the tie-breaker. Filtered pages are keyed on
+    # `filtered_sort` unless ?sort= says otherwise, so that the filter's
+    # index also yields the order and a page never sorts every match.
+    columnar = parse_columnar()
+    clauses, filter_params = parse_filters(filters or {})
+    params = list(params) + filter_params
+    sorts = {"id": int, **(sorts or {})}
+
+    sort = request.args.get("sort", filtered_sort if clauses else "id")
+    descending = sort.startswith("-")
+    column = sort.removeprefix("-")
+    if column not in sorts:
+        raise QueryError("Invalid sort column!")
+
+    limit = parse_limit()
+    direction = "DESC" if descending else "ASC"
+    operator = "<" if descending else ">"
+
+    after = request.args.get("after")
+    if after:
+        try:
+            if column == "id":
+                clauses.append(f"id {operator} ?")
+                params.append(int(after))
+            else:
+                value, _, row_id = after.rpartition(":")
+                clauses.append(f"({column}, id) {operator} (?, ?)")
+                params.extend((sorts[column](value), int(row_id)))
+        except ValueError:
+            raise QueryError("Invalid cursor!")
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = f"id {direction}"
+    if column != "id":
+        order = f"{column} {direction}, {order}"
+
+    # Columnar pages are serialized straight from the row tuples
+    cursor = db.cursor()
+    if columnar:
+        cursor.row_factory = None
+
+    rows = cursor.execute(
+        f"""
+        {select}
+        {where}
+        ORDER BY {order}
+        LIMIT ?;
+        """,
+        tuple(params + [limit + 1]),
+    ).fetchall()
+
+    names = [description[0] for description in cursor.description]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        row_id = last[names.index("id")]
+        next_cursor = row_id if column == "id" else f"{last[names.index(column)]}:{row_id}"
+
+    if columnar:
+        return {"columns": names, "rows": rows, "next_cursor": next_cursor}
+
+    return {"items": [dict(row) for row in rows], "next_cursor": next_cursor}
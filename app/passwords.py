@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from .app import *
+
+
+HASH_WORKERS = int(os.environ.get("INVENTORY_DB_HASH_WORKERS", os.cpu_count() or 2))
+HASH_QUEUE = int(os.environ.get("INVENTORY_DB_HASH_QUEUE", 32))
+LOGIN_ATTEMPTS = int(os.environ.get("INVENTORY_DB_LOGIN_ATTEMPTS", 5))
+LOGIN_WINDOW = int(os.environ.get("INVENTORY_DB_LOGIN_WINDOW", 300))
+TRACKED_USERNAMES = 10000
+
+# bcrypt releases the GIL, so a few dedicated threads hash in parallel while
+# capping how much CPU password work can take away from other requests
+executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+pending = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE)
+
+
+class HashQueueFull(Exception):
+    pass
+
+
+@app.errorhandler(HashQueueFull)
+def hash_queue_full(e):
+    return {"message": "The server is busy. Please try again."}, 503, {"Retry-After": "1"}
+
+
+def run_hash(func, *args):
+    # Rejects instead of queueing without bound once every slot is taken
+    if not pending.acquire(blocking=False):
+        raise HashQueueFull()
+
+    started = time.perf_counter()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        pending.release()
+        record_timing("bcrypt", time.perf_counter() - started)
+
+
+def hash_password(password):
+    return run_hash(bcrypt.generate_password_hash, password).decode()
+
+
+def check_password(password_hash, password):
+    return run_hash(bcrypt.check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    # bcrypt hashes look like $2b$12$...; the second field is the cost
+    try:
+        rounds = int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+
+    return rounds != app.config["BCRYPT_LOG_ROUNDS"]
+
+
+# Failed logins per username: {username: (failures, window start)}
+failures = OrderedDict()
+failures_lock = threading.Lock()
+
+
+def login_retry_after(username):
+    # Seconds until `username` may try again, or 0 if it is not throttled
+    with failures_lock:
+        count, start = failures.get(username, (0, 0))
+
+    remaining = start + LOGIN_WINDOW - time.monotonic()
+    if count >= LOGIN_ATTEMPTS and remaining > 0:
+        return int(remaining) + 1
+
+    return 0
+
+
+def record_login_failure(username):
+    now = time.monotonic()
+    with failures_lock:
+        count, start = failures.pop(username, (0, now))
+        if now - start > LOGIN_WINDOW:
+            count, start = 0, now
+
+        failures[username] = (count + 1, start)
+        while len(failures) > TRACKED_USERNAMES:
+            failures.popitem(last=False)
+
+
+def clear_login_failures(username):
+    with failures_lock:
+        failures.pop(username, None)
@@ -0,0 +1,149 @@
+import queue
+import sqlite3
+import threading
+
+
+# Applied once to every connection when it is opened
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": "5000",
+    "mmap_size": "268435456",
+    "cache_size": "-16000",
+    "temp_store": "MEMORY",
+}
+
+
+def parse_pragmas(spec):
+    # Parses "key=value;key=value" into a dict; an empty value drops the pragma
+    pragmas = {}
+    for item in (spec or "").split(";"):
+        if not item.strip():
+            continue
+
+        key, _, value = item.partition("=")
+        pragmas[key.strip().lower()] = value.strip()
+
+    return pragmas
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, path, size=8, timeout=10.0, pragmas=None, setup=None, factory=sqlite3.Connection):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.setup = setup
+        self.factory = factory
+        self.pragmas = {
+            key: value
+            for key, value in {**DEFAULT_PRAGMAS, **(pragmas or {})}.items()
+            if value
+        }
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def connect(self):
+        db = sqlite3.connect(
+            self.path,
+            timeout=int(self.pragmas.get("busy_timeout", 5000)) / 1000,
+            check_same_thread=False,
+            factory=self.factory,
+        )
+        db.row_factory = sqlite3.Row
+
+        for key, value in self.pragmas.items():
+            db.execute(f"PRAGMA {key} = {value};")
+
+        if self.setup:
+            self.setup(db)
+
+        return db
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise PoolExhausted("The connection pool has been closed.")
+
+            if self._opened < self.size:
+                self._opened += 1
+                grow = True
+            else:
+                grow = False
+
+        if grow:
+            try:
+                return self.connect()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolExhausted(
+                f"No database connection became available within {self.timeout}s."
+            )
+
+    def release(self, db):
+        # Never hand a connection with a dangling transaction to the next request
+        try:
+            if db.in_transaction:
+                db.rollback()
+        except sqlite3.Error:
+            self._discard(db)
+            return
+
+        with self._lock:
+            closed = self._closed
+
+        if closed:
+            self._discard(db)
+        else:
+            self._idle.put(db)
+
+    def _discard(self, db):
+        with self._lock:
+            self._opened -= 1
+
+        try:
+            db.close()
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        with self._lock:
+            opened = self._opened
+
+        idle = self._idle.qsize()
+        return {
+            "size": self.size,
+            "opened": opened,
+            "idle": idle,
+            "in_use": opened - idle,
+        }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+            self._discard(db)
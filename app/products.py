@@ -1,23 +1,46 @@
 from .app import *
+from .etags import conditional
+from .imports import import_rows, to_bool, to_int, to_str
 from .login import privileged
+from .lookup import lookup, requested_ids
+from .pagination import fetch_page, parse_bool, parse_fields
+from .writer import write
+
+
+PRODUCT_COLUMNS = ("id", "sku", "active", "name", "price_cents", "quantity", "description", "category_id")
 
 
 @app.get("/api/products")
 @privileged("r")
+@conditional("products", cache=True, columns={"quantity": ("product_stock",)})
 def get_products():
+    fields = parse_fields(PRODUCT_COLUMNS)
     with get_database() as db:
-        rows = db.execute(
-            """
-            SELECT id, sku, active, name, price_cents, quantity, description, category_id
-            FROM products;
-            """
-        ).fetchall()
+        if "ids" in request.args:
+            return lookup(db, "products", fields, requested_ids())
+
+        return fetch_page(
+            db,
+            f"SELECT {', '.join(fields)} FROM products",
+            filters={
+                "category_id": ("category_id = ?", int),
+                "active": ("active = ?", parse_bool),
+            },
+            sorts={"name": str, "price_cents": int, "quantity": int},
+        )
 
-    return [dict(row) for row in rows]
+
+@app.post("/api/products/lookup")
+@privileged("r")
+def lookup_products():
+    fields = parse_fields(PRODUCT_COLUMNS)
+    with get_database() as db:
+        return lookup(db, "products", fields, requested_ids())
 
 
 @app.get("/api/products/<int:product_id>")
 @privileged("r")
+@conditional("products", cache=True, row=("product_versions", "product_id"))
 def get_product(product_id):
     with get_database() as db:
         row = db.execute(
@@ -79,6 +102,54 @@ def create_product():
     return {"message": "Product has been created.", "id": product_id}, 201
 
 
+def product_error(exc):
+    if "sku" in str(exc):
+        return "SKU already exists!"
+    if "category_id" in str(exc) or "FOREIGN KEY" in str(exc):
+        return "Category does not exist!"
+    return "Invalid input or constraint violation!"
+
+
+@app.post("/api/products/import")
+@privileged("w")
+def import_products():
+    with get_database() as db:
+        categories = {
+            row["name"]: row["id"] for row in db.execute("SELECT id, name FROM categories;")
+        }
+
+        # A `category` column is resolved by name against the in-memory map
+        def prepare(record, values):
+            name = record.get("category")
+            if name:
+                if name not in categories:
+                    raise ValueError("Category does not exist!")
+                values["category_id"] = categories[name]
+            return values
+
+        report = import_rows(
+            db,
+            {
+                "table": "products",
+                "key": "sku",
+                "match": "sku = ?",
+                "fields": {
+                    "sku": to_str,
+                    "active": to_bool,
+                    "name": to_str,
+                    "price_cents": to_int,
+                    "description": to_str,
+                    "category_id": to_int,
+                },
+                "required": ["active", "name", "price_cents"],
+                "prepare": prepare,
+                "error": product_error,
+            },
+        )
+
+    return {"message": "Products have been imported.", **report}
+
+
 @app.patch("/api/products/<int:product_id>")
 @privileged("w")
 def update_product(product_id):
@@ -104,24 +175,25 @@ def update_product(product_id):
     if not fields:
         return {"message": "Nothing to update."}, 400
 
-    with get_database() as db:
-        try:
-            result = db.execute(
+    try:
+        updated = write(
+            lambda db: db.execute(
                 f"""
                 UPDATE products
                 SET {', '.join(fields)}
                 WHERE id = ?;
                 """,
                 tuple(values + [product_id]),
-            )
-        except sqlite3.IntegrityError as e:
-            if "sku" in str(e):
-                return {"message": "SKU already exists!"}, 409
-            if "category_id" in str(e):
-                return {"message": "Category does not exist!"}, 400
-            return {"message": "Invalid input or constraint violation!"}, 400
-
-    if result.rowcount == 0:
+            ).rowcount
+        )
+    except sqlite3.IntegrityError as e:
+        if "sku" in str(e):
+            return {"message": "SKU already exists!"}, 409
+        if "category_id" in str(e):
+            return {"message": "Category does not exist!"}, 400
+        return {"message": "Invalid input or constraint violation!"}, 400
+
+    if updated == 0:
         return {"message": "Product is not found!"}, 404
 
     return {"message": "Product has been updated."}
@@ -131,13 +203,16 @@ def update_product(product_id):
 @privileged("a")
 def delete_product(product_id):
     with get_database() as db:
-        result = db.execute(
-            """
-            DELETE FROM products
-            WHERE id = ?;
-            """,
-            (product_id,),
-        )
+        try:
+            result = db.execute(
+                """
+                DELETE FROM products
+                WHERE id = ?;
+                """,
+                (product_id,),
+            )
+        except sqlite3.IntegrityError:
+            return {"message": "Product still has inventory logs!"}, 409
 
     if result.rowcount == 0:
         return {"message": "Product is not found!"}, 404
@@ -0,0 +1,79 @@
+from .app import *
+from .login import privileged
+
+
+# bucket: (rollup period, SQL expression for the start of the bucket)
+BUCKETS = {
+    "hour": ("h", "r.bucket"),
+    "day": ("d", "r.bucket"),
+    "month": ("d", "unixepoch(r.bucket, 'unixepoch', 'start of month')"),
+}
+
+# group_by: (rollup table, grouping column, measures)
+GROUPS = {
+    None: ("sales_rollup", None, ("sales_count", "revenue_cents")),
+    "customer": ("sales_rollup", "NULLIF(r.customer_id, 0) AS customer_id", ("sales_count", "revenue_cents")),
+    "user": ("sales_rollup", "NULLIF(r.user_id, 0) AS user_id", ("sales_count", "revenue_cents")),
+    "product": ("sales_product_rollup", "r.product_id", ("quantity", "revenue_cents")),
+    # Attributed to each product's current category
+    "category": ("sales_product_rollup", "p.category_id", ("quantity", "revenue_cents")),
+}
+
+
+@app.get("/api/reports/sales")
+@privileged("r")
+def get_sales_report():
+    bucket = request.args.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return {"message": "The bucket must be hour, day or month!"}, 400
+
+    group_by = request.args.get("group_by") or None
+    if group_by not in GROUPS:
+        return {
+            "message": "Sales can only be grouped by product, category, customer or user!"
+        }, 400
+
+    period, bucket_sql = BUCKETS[bucket]
+    table, group_sql, measures = GROUPS[group_by]
+
+    clauses = ["r.period = ?"]
+    params = [period]
+    for name, clause in (("from", "r.bucket >= ?"), ("to", "r.bucket < ?")):
+        value = request.args.get(name)
+        if not value:
+            continue
+
+        try:
+            params.append(int(value))
+        except ValueError:
+            return {"message": f"Invalid {name} time!"}, 400
+
+        clauses.append(clause)
+
+    columns = [f"{bucket_sql} AS bucket"]
+    if group_sql:
+        columns.append(group_sql)
+    columns += [f"SUM(r.{measure}) AS {measure}" for measure in measures]
+
+    join = "LEFT JOIN products AS p ON (p.id = r.product_id)" if group_by == "category" else ""
+    grouping = "1, 2" if group_sql else "1"
+
+    with get_database() as db:
+        rows = db.execute(
+            f"""
+            SELECT {', '.join(columns)}
+            FROM {table} AS r
+                {join}
+            WHERE {' AND '.join(clauses)}
+            GROUP BY {grouping}
+            HAVING {' OR '.join(f'SUM(r.{measure}) != 0' for measure in measures)}
+            ORDER BY {grouping};
+            """,
+            tuple(params),
+        ).fetchall()
+
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "rows": [dict(row) for row in rows],
+    }
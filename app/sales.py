@@ -1,24 +1,189 @@
 from .app import *
+from .etags import conditional
+from .export import export_rows
+from .idempotency import claimed, idempotent
 from .login import privileged
+from .lookup import fetch_by_ids, lookup, requested_ids, rows_by_id
+from .pagination import fetch_page, parse_columnar, parse_fields
+from .writer import write
+
+
+SALE_COLUMNS = ("id", "time", "total_cents", "customer_id", "user_id")
+
+# Tables each ?expand= option reads, for the ETag
+SALE_EXPANSIONS = {
+    "details": ("sales_details", "inventory_logs"),
+    "customer": ("customers",),
+    "user": ("users",),
+    "product": ("sales_details", "inventory_logs", "products", "product_stock"),
+}
+
+
+def parse_expand():
+    expand = {
+        option.strip() for option in request.args.get("expand", "").split(",") if option.strip()
+    }
+    if not expand <= SALE_EXPANSIONS.keys():
+        raise QueryError("Invalid expand option!")
+
+    # Products are embedded in the details, so they bring the details along
+    if "product" in expand:
+        expand.add("details")
+
+    return expand
+
+
+def expand_sales(db, sales, expand):
+    # Resolves ?expand= for a list of sales with one query per option (per
+    # chunk of ids), never one per sale
+    if "details" in expand:
+        details = {sale["id"]: [] for sale in sales}
+        for row in fetch_by_ids(
+            db,
+            """
+            SELECT sd.sale_id, sd.subtotal_cents, sd.log_id, sd.note, il.product_id, -il.delta AS quantity
+            FROM sales_details AS sd
+                LEFT JOIN inventory_logs AS il
+                ON (sd.log_id = il.id)
+            """,
+            details,
+            column="sd.sale_id",
+        ):
+            detail = dict(row)
+            details[detail.pop("sale_id")].append(detail)
+
+        for sale in sales:
+            sale["details"] = details[sale["id"]]
+
+    if "product" in expand:
+        products = rows_by_id(
+            db,
+            """
+            SELECT id, sku, active, name, price_cents, quantity, description, category_id
+            FROM products
+            """,
+            (detail["product_id"] for sale in sales for detail in sale["details"] if detail["product_id"]),
+        )
+        for sale in sales:
+            for detail in sale["details"]:
+                detail["product"] = products.get(detail["product_id"])
+
+    if "customer" in expand:
+        customers = rows_by_id(
+            db,
+            """
+            SELECT id, name, email, phone, address, city, state, post_code, country
+            FROM customers
+            """,
+            (sale["customer_id"] for sale in sales if sale["customer_id"]),
+        )
+        for sale in sales:
+            sale["customer"] = customers.get(sale["customer_id"])
+
+    if "user" in expand:
+        users = rows_by_id(
+            db,
+            """
+            SELECT id, username, role
+            FROM users
+            """,
+            (sale["user_id"] for sale in sales if sale["user_id"]),
+        )
+        for sale in sales:
+            sale["user"] = users.get(sale["user_id"])
+
+    return sales
 
 
 @app.get("/api/sales")
 @privileged("r")
+@conditional("sales", expand=SALE_EXPANSIONS)
 def get_sales():
+    expand = parse_expand()
+    if expand and parse_columnar():
+        raise QueryError("Expanded sales cannot be listed in columns!")
+
+    fields = sale_fields(expand)
     with get_database() as db:
-        rows = db.execute(
-            """
-            SELECT id, time, total_cents, customer_id, user_id
-            FROM sales;
-            """
-        ).fetchall()
+        if "ids" in request.args:
+            return lookup_sales_by_id(db, fields, expand)
 
-    return [dict(row) for row in rows]
+        page = fetch_page(
+            db,
+            f"SELECT {', '.join(fields)} FROM sales",
+            filters={
+                "customer_id": ("customer_id = ?", int),
+                "user_id": ("user_id = ?", int),
+                "time_from": ("time >= ?", int),
+                "time_to": ("time < ?", int),
+            },
+            sorts={"time": int, "total_cents": int},
+            filtered_sort="time",
+        )
+        if expand:
+            expand_sales(db, page["items"], expand)
+
+    return page
+
+
+def sale_fields(expand):
+    # Filtered pages are keyed on time; expansions are resolved from the
+    # sales' own foreign keys
+    return parse_fields(
+        SALE_COLUMNS, required=["time", *(f"{option}_id" for option in expand & {"customer", "user"})]
+    )
+
+
+def lookup_sales_by_id(db, fields, expand):
+    result = lookup(db, "sales", fields, requested_ids())
+    expand_sales(db, [sale for sale in result["items"].values() if sale], expand)
+    return result
+
+
+@app.post("/api/sales/lookup")
+@privileged("r")
+def lookup_sales():
+    expand = parse_expand()
+    fields = sale_fields(expand)
+    with get_database() as db:
+        return lookup_sales_by_id(db, fields, expand)
+
+
+@app.get("/api/sales/export")
+@privileged("r")
+def export_sales():
+    return export_rows(
+        """
+        SELECT id, time, total_cents, customer_id, user_id
+        FROM sales
+        """,
+        "sales",
+    )
+
+
+@app.get("/api/sales/details/export")
+@privileged("r")
+def export_sales_details():
+    # Details have no time of their own; the watermark is on the sale's time
+    return export_rows(
+        """
+        SELECT sd.id, sd.sale_id, sd.subtotal_cents, sd.log_id, sd.note
+        FROM sales_details AS sd
+            JOIN sales AS s
+            ON (s.id = sd.sale_id)
+        """,
+        "sales_details",
+        id_column="sd.id",
+        time_column="s.time",
+    )
 
 
 @app.get("/api/sales/<int:sale_id>")
 @privileged("r")
+@conditional("sales", "sales_details", "inventory_logs", expand=SALE_EXPANSIONS)
 def get_sale(sale_id):
+    # Details are always included
+    expand = parse_expand() - {"details"}
     with get_database() as db:
         head = db.execute(
             """
@@ -34,7 +199,7 @@ def get_sale(sale_id):
 
         details = db.execute(
             """
-            SELECT sl.subtotal_cents, sl.log_id, sl.note, il.product_id, -il.delta AS quantity
+            SELECT sd.subtotal_cents, sd.log_id, sd.note, il.product_id, -il.delta AS quantity
             FROM sales_details AS sd
                 LEFT JOIN inventory_logs AS il
                 ON (sd.log_id = il.id)
@@ -43,87 +208,279 @@ def get_sale(sale_id):
             (sale_id,),
         ).fetchall()
 
-    return {
-        "id": head["id"],
-        "time": head["time"],
-        "total_cents": head["total_cents"],
-        "customer_id": head["customer_id"],
-        "user_id": head["user_id"],
-        "details": [dict(row) for row in details],
-    }
+        sale = {
+            "id": head["id"],
+            "time": head["time"],
+            "total_cents": head["total_cents"],
+            "customer_id": head["customer_id"],
+            "user_id": head["user_id"],
+            "details": [dict(row) for row in details],
+        }
+        expand_sales(db, [sale], expand)
+
+    return sale
 
 
 @app.post("/api/sales")
 @privileged("w")
+@idempotent
 def create_sale():
     data = request.get_json(force=True)
-    if not data:
+    if not data or not isinstance(data, dict):
         return {"message": "A JSON body is required!"}, 400
 
-    customer_id = data.get("customer_id")
-    if not customer_id:
-        return {"message": "A customer is required!"}, 400
+    # Checked up front, so a rejected sale never reaches the writer; unlike
+    # batched offline sales, a sale posted here is always dated now
+    error = validate_sale({**data, "time": None})
+    if error:
+        return {"message": error}, 400
+
+    try:
+        sale_id = write(claimed(insert_sale, sale_created), data["customer_id"], data["details"], session["user_id"])
+    except sqlite3.IntegrityError as exc:
+        return {"message": sale_error(exc)}, 400
+
+    return sale_created(sale_id)
+
+
+def sale_created(sale_id):
+    return {"message": "Sale has been created.", "id": sale_id}, 201
+
+
+def insert_sale(db, customer_id, details, user_id):
+    sale_id = db.execute(
+        """
+        INSERT INTO sales (customer_id, user_id)
+        VALUES (?, ?);
+        """,
+        (customer_id, user_id),
+    ).lastrowid
+
+    for item in details:
+        log_id = None
+        if item.get("product_id"):
+            log_id = db.execute(
+                """
+                INSERT INTO inventory_logs (type, product_id, delta, note)
+                VALUES ('s', ?, ?, ?);
+                """,
+                (
+                    item["product_id"],
+                    -item["quantity"],
+                    f"Automatic logging from sale #{sale_id}: {item.get('note')}",
+                ),
+            ).lastrowid
+
+        db.execute(
+            """
+            INSERT INTO sales_details (subtotal_cents, sale_id, log_id, note)
+            VALUES (?, ?, ?, ?);
+            """,
+            (item["subtotal_cents"], sale_id, log_id, item.get("note")),
+        )
+
+    return sale_id
+
+
+MAX_SALE_BATCH = 1000
+
+
+def is_integer(value):
+    # JSON true and false decode to bools, which Python counts as ints
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_sale(data):
+    # Checks shared by create_sale and batches; returns an error message or None
+    if not isinstance(data, dict) or not data.get("customer_id"):
+        return "A customer is required!"
+    if not is_integer(data["customer_id"]):
+        return "The customer must be an integer id!"
 
     details = data.get("details")
     if not details or not isinstance(details, list):
-        return {"message": "A non-empty list of details is required!"}, 400
+        return "A non-empty list of details is required!"
+
+    for item in details:
+        if not isinstance(item, dict) or not item.get("subtotal_cents"):
+            return "Each detail requires a subtotal!"
+        if not is_integer(item["subtotal_cents"]):
+            return "Each subtotal must be an integer number of cents!"
+        if item.get("product_id") is not None and not is_integer(item["product_id"]):
+            return "Each product must be an integer id!"
+        if item.get("product_id") and not item.get("quantity"):
+            return "Each detail that contains inventory change must have a quantity!"
+        if item.get("product_id") and not is_integer(item["quantity"]):
+            return "Each quantity must be an integer!"
+
+    if data.get("time") is not None and not is_integer(data["time"]):
+        return "The sale time must be a Unix timestamp!"
+
+    return None
+
+
+def new_ids(db, table, previous_max):
+    # Inside a write transaction every id above the previous maximum is ours,
+    # in insertion order, because AUTOINCREMENT never reuses or reorders ids
+    return [
+        row[0]
+        for row in db.execute(
+            f"SELECT id FROM {table} WHERE id > ? ORDER BY id;", (previous_max,)
+        )
+    ]
+
+
+def max_id(db, table):
+    return db.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table};").fetchone()[0]
+
+
+def insert_sales(db, sales, user_id):
+    # Inserts whole sales with one executemany per table; returns the sale ids
+    previous = max_id(db, "sales")
+    db.executemany(
+        """
+        INSERT INTO sales (customer_id, user_id, time)
+        VALUES (?, ?, COALESCE(?, unixepoch()));
+        """,
+        [(sale["customer_id"], user_id, sale.get("time")) for sale in sales],
+    )
+    sale_ids = new_ids(db, "sales", previous)
+
+    items = [
+        (sale_id, sale, item)
+        for sale_id, sale in zip(sale_ids, sales)
+        for item in sale["details"]
+    ]
+
+    # Ledger entries of offline sales are dated with the sale itself
+    previous = max_id(db, "inventory_logs")
+    db.executemany(
+        """
+        INSERT INTO inventory_logs (type, product_id, delta, note, time)
+        VALUES ('s', ?, ?, ?, COALESCE(?, unixepoch()));
+        """,
+        [
+            (
+                item["product_id"],
+                -item["quantity"],
+                f"Automatic logging from sale #{sale_id}: {item.get('note')}",
+                sale.get("time"),
+            )
+            for sale_id, sale, item in items
+            if item.get("product_id")
+        ],
+    )
+    log_ids = iter(new_ids(db, "inventory_logs", previous))
+
+    db.executemany(
+        """
+        INSERT INTO sales_details (subtotal_cents, sale_id, log_id, note)
+        VALUES (?, ?, ?, ?);
+        """,
+        [
+            (
+                item["subtotal_cents"],
+                sale_id,
+                next(log_ids) if item.get("product_id") else None,
+                item.get("note"),
+            )
+            for sale_id, _, item in items
+        ],
+    )
+
+    return sale_ids
+
+
+def sale_error(exc):
+    msg = str(exc).lower()
+    if "customer_id" in msg:
+        return "Customer does not exist!"
+    if "product_id" in msg:
+        return "Product does not exist!"
+    if "quantity" in msg:
+        return "Not enough stock!"
+    return "Invalid input or constraint violation!"
+
+
+@app.post("/api/sales/batch")
+@privileged("w")
+def create_sales_batch():
+    data = request.get_json(force=True)
+    if not isinstance(data, dict) or not isinstance(data.get("sales"), list):
+        return {"message": "A JSON body with a list of sales is required!"}, 400
+
+    sales = data["sales"]
+    if not 1 <= len(sales) <= MAX_SALE_BATCH:
+        return {
+            "message": f"A batch must contain between 1 and {MAX_SALE_BATCH} sales!"
+        }, 400
+
+    results = [{"index": index} for index in range(len(sales))]
+    pending = []
+    for index, sale in enumerate(sales):
+        error = validate_sale(sale)
+        if error:
+            results[index]["message"] = error
+        else:
+            pending.append(index)
 
     with get_database() as db:
+        db.execute("BEGIN IMMEDIATE;")
+
+        # Unknown customers and products are rejected up front with two set
+        # lookups (chunked, as a batch may name thousands of products)
+        # instead of surfacing as foreign key errors mid-batch
+        customers = {sales[index]["customer_id"] for index in pending}
+        products = {
+            item["product_id"]
+            for index in pending
+            for item in sales[index]["details"]
+            if item.get("product_id")
+        }
+        known_customers = {row[0] for row in fetch_by_ids(db, "SELECT id FROM customers", customers)}
+        known_products = {row[0] for row in fetch_by_ids(db, "SELECT id FROM products", products)}
+
+        valid = []
+        for index in pending:
+            sale = sales[index]
+            if sale["customer_id"] not in known_customers:
+                results[index]["message"] = "Customer does not exist!"
+            elif any(
+                item.get("product_id") and item["product_id"] not in known_products
+                for item in sale["details"]
+            ):
+                results[index]["message"] = "Product does not exist!"
+            else:
+                valid.append(index)
+
+        user_id = session["user_id"]
         try:
-            cursor = db.execute(
-                """
-                INSERT INTO sales (customer_id, user_id)
-                VALUES (?, ?);
-                """,
-                (customer_id, session["user_id"]),
-            )
-            sale_id = cursor.lastrowid
-
-            for item in details:
-                product_id = item.get("product_id")
-                quantity = item.get("quantity")
-                subtotal = item.get("subtotal_cents")
-                note = item.get("note")
-
-                if not subtotal:
-                    return {"message": "Each detail requires a subtotal!"}, 400
-
-                log_id = None
-                if product_id:
-                    if not quantity:
-                        return {
-                            "message": "Each detail that contains inventory change must have a quantity!"
-                        }, 400
-
-                    log_cur = db.execute(
-                        """
-                        INSERT INTO inventory_logs (type, product_id, delta, note)
-                        VALUES ('s', ?, ?, ?);
-                        """,
-                        (
-                            product_id,
-                            -quantity,
-                            f"Automatic logging from sale #{sale_id}: {note}",
-                        ),
-                    )
-                    log_id = log_cur.lastrowid
-
-                db.execute(
-                    """
-                    INSERT INTO sales_details (subtotal_cents, sale_id, log_id, note)
-                    VALUES (?, ?, ?, ?);
-                    """,
-                    (subtotal, sale_id, log_id, note),
-                )
-        except sqlite3.IntegrityError as exc:
-            msg = str(exc).lower()
-            if "customer_id" in msg:
-                return {"message": "Customer does not exist!"}, 400
-            if "product_id" in msg:
-                return {"message": "Product does not exist!"}, 400
-            return {"message": "Invalid input or constraint violation!"}, 400
+            db.execute("SAVEPOINT sales_batch;")
+            sale_ids = insert_sales(db, [sales[index] for index in valid], user_id)
+            db.execute("RELEASE sales_batch;")
+            for index, sale_id in zip(valid, sale_ids):
+                results[index]["id"] = sale_id
+        except sqlite3.IntegrityError:
+            # Something like a stock shortage; redo the batch sale by sale so
+            # only the offending sales are rejected
+            db.execute("ROLLBACK TO sales_batch;")
+            db.execute("RELEASE sales_batch;")
 
-    return {"message": "Sale has been created.", "id": sale_id}, 201
+            for index in valid:
+                db.execute("SAVEPOINT sale;")
+                try:
+                    (results[index]["id"],) = insert_sales(db, [sales[index]], user_id)
+                    db.execute("RELEASE sale;")
+                except sqlite3.IntegrityError as exc:
+                    db.execute("ROLLBACK TO sale;")
+                    db.execute("RELEASE sale;")
+                    results[index]["message"] = sale_error(exc)
+
+    created = sum("id" in result for result in results)
+    return {
+        "message": f"{created} of {len(sales)} sales have been created.",
+        "results": results,
+    }
 
 
 @app.delete("/api/sales/<int:sale_id>")
@@ -0,0 +1,70 @@
+import re
+
+from .app import *
+from .etags import conditional
+from .login import privileged
+from .pagination import parse_bool, parse_filters, parse_limit
+
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def match_query(text):
+    # Turns free text into an FTS5 query where every word must match as a
+    # prefix; words are quoted so user input is never parsed as FTS syntax
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        raise QueryError("A search query is required!")
+
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(index, table, columns, weights, filters=None):
+    # Best matches first, ranked by bm25 with per-column weights
+    query = match_query(request.args.get("q"))
+    limit = parse_limit(SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+    clauses, params = parse_filters(filters or {})
+
+    with get_database() as db:
+        rows = db.execute(
+            f"""
+            SELECT {', '.join(f't.{column}' for column in columns)}
+            FROM {index}
+                JOIN {table} AS t ON (t.id = {index}.rowid)
+            WHERE {index} MATCH ? {''.join(f' AND t.{clause}' for clause in clauses)}
+            ORDER BY bm25({index}, {', '.join(map(str, weights))})
+            LIMIT ?;
+            """,
+            (query, *params, limit),
+        ).fetchall()
+
+    return {"items": [dict(row) for row in rows]}
+
+
+@app.get("/api/products/search")
+@privileged("r")
+@conditional("products", "product_stock", cache=True)
+def search_products():
+    return search(
+        "products_search",
+        "products",
+        ["id", "sku", "active", "name", "price_cents", "quantity", "description", "category_id"],
+        weights=(10.0, 5.0, 1.0),  # name, sku, description
+        filters={
+            "category_id": ("category_id = ?", int),
+            "active": ("active = ?", parse_bool),
+        },
+    )
+
+
+@app.get("/api/customers/search")
+@privileged("r")
+@conditional("customers")
+def search_customers():
+    return search(
+        "customers_search",
+        "customers",
+        ["id", "name", "email", "phone", "address", "city", "state", "post_code", "country"],
+        weights=(10.0, 5.0, 5.0),  # name, email, phone
+    )
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import click
+
+from .app import *
+from .login import privileged
+from .pagination import fetch_page
+
+
+CHECKPOINT_INTERVAL = int(os.environ.get("INVENTORY_DB_CHECKPOINT_INTERVAL", 86400))
+
+checkpointer = None
+checkpointer_lock = threading.Lock()
+
+# Quantity of each product at :at, starting from its latest checkpoint item
+# at or before that time and replaying only the logs after it
+STOCK_AT = """
+    SELECT id, :at AS time,
+        COALESCE(c.quantity, 0) + COALESCE(
+            (
+                SELECT SUM(il.delta)
+                FROM inventory_logs AS il
+                WHERE il.product_id = p.id
+                    AND il.time > COALESCE(c.checkpoint_time, -1)
+                    AND il.time <= :at
+            ),
+            0
+        ) AS quantity,
+        c.checkpoint_time
+    FROM products AS p
+        LEFT JOIN stock_checkpoint_items AS c
+        ON (
+            c.product_id = p.id
+            AND c.checkpoint_time = (
+                SELECT MAX(checkpoint_time)
+                FROM stock_checkpoint_items
+                WHERE product_id = p.id AND checkpoint_time <= :at
+            )
+        )
+    """
+
+
+def parse_at():
+    value = request.args.get("at")
+    if not value:
+        return int(time.time())
+
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError("Invalid time!")
+
+
+@app.get("/api/products/<int:product_id>/stock")
+@privileged("r")
+def get_product_stock(product_id):
+    with get_database() as db:
+        row = db.execute(
+            f"""
+            {STOCK_AT}
+            WHERE id = :id;
+            """,
+            {"at": parse_at(), "id": product_id},
+        ).fetchone()
+
+    if row is None:
+        return {"message": "Product is not found!"}, 404
+
+    return dict(row)
+
+
+@app.get("/api/products/stock")
+@privileged("r")
+def get_products_stock():
+    at = parse_at()
+    with get_database() as db:
+        # Positional placeholders only, so the named ones are bound up front
+        return fetch_page(
+            db,
+            STOCK_AT.replace(":at", "?"),
+            filters={"category_id": ("category_id = ?", int)},
+            params=(at,) * STOCK_AT.count(":at"),
+        )
+
+
+def create_checkpoint(db, at):
+    # Records the stock of every product changed since the previous
+    # checkpoint; returns False if a checkpoint at `at` already exists
+    db.execute("BEGIN IMMEDIATE;")
+    try:
+        previous = db.execute(
+            "SELECT COALESCE(MAX(time), -1) FROM stock_checkpoints;"
+        ).fetchone()[0]
+        if previous >= at:
+            db.rollback()
+            return False
+
+        db.execute("INSERT INTO stock_checkpoints (time) VALUES (?);", (at,))
+        # Each item is the product's stock at `at` worked out like any other
+        # point-in-time query, from its latest item plus every log since.
+        # Starting from `previous` instead would miss logs backdated to
+        # before a checkpoint that holds no item for the product.
+        db.execute(
+            f"""
+            INSERT INTO stock_checkpoint_items (product_id, checkpoint_time, quantity)
+            SELECT id, time, quantity
+            FROM ({STOCK_AT})
+            WHERE id IN (
+                SELECT product_id
+                FROM inventory_logs
+                WHERE time > :previous AND time <= :at
+            );
+            """,
+            {"at": at, "previous": previous},
+        )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    return True
+
+
+def checkpoint_due():
+    # Checkpoints land on interval boundaries, so workers racing to take
+    # the same one insert it once
+    at = int(time.time()) // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL
+    db = pool.connect()
+    try:
+        if create_checkpoint(db, at):
+            info(f"Created stock checkpoint at {at}")
+    finally:
+        db.close()
+
+
+def run_checkpoints():
+    while True:
+        try:
+            checkpoint_due()
+        except Exception as e:
+            logging.error(f"Stock checkpoint failed: {e}")
+
+        time.sleep(CHECKPOINT_INTERVAL - time.time() % CHECKPOINT_INTERVAL + 1)
+
+
+@app.before_request
+def start_checkpoints():
+    # Started by the first request each server process handles rather than
+    # on import, so CLI commands and tests never run one. Set
+    # INVENTORY_DB_CHECKPOINT_INTERVAL=0 to rely on `flask checkpoint-stock`.
+    global checkpointer
+    if CHECKPOINT_INTERVAL <= 0 or (checkpointer is not None and checkpointer.is_alive()):
+        return
+
+    with checkpointer_lock:
+        if checkpointer is None or not checkpointer.is_alive():
+            checkpointer = threading.Thread(target=run_checkpoints, name="stock-checkpoints", daemon=True)
+            checkpointer.start()
+
+
+@app.cli.command("checkpoint-stock")
+@click.option("--at", type=int, help="Unix time of the checkpoint (default: now).")
+def checkpoint_stock_command(at):
+    """Records a stock checkpoint for point-in-time stock queries."""
+    db = pool.connect()
+    try:
+        at = int(time.time()) if at is None else at
+        if create_checkpoint(db, at):
+            click.echo(f"Created stock checkpoint at {at}.")
+        else:
+            click.echo("A checkpoint at or after that time already exists.")
+    finally:
+        db.close()
+
@@ -0,0 +1,181 @@
+from collections import deque
+from logging import warning
+import os
+import re
+import sqlite3
+import threading
+import time
+from time import perf_counter
+
+from flask import g, has_app_context, has_request_context, request, session
+from flask.json.provider import DefaultJSONProvider
+
+
+SLOW_QUERY_MS = float(os.environ.get("INVENTORY_DB_SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG = int(os.environ.get("INVENTORY_DB_SLOW_QUERY_LOG", 200))
+
+# Seconds, so the per-statement check is a single comparison; 0 disables it
+slow_query = SLOW_QUERY_MS / 1000 if SLOW_QUERY_MS > 0 else float("inf")
+slow_queries = deque(maxlen=SLOW_QUERY_LOG)
+slow_queries_lock = threading.Lock()
+
+
+# Per-request time spent in SQLite, waiting for a connection, in bcrypt and
+# encoding JSON, kept on `g` as {segment: [seconds, count]}
+def record_timing(segment, seconds, count=1):
+    if not has_app_context():
+        return
+
+    timing = g.setdefault("timings", {}).setdefault(segment, [0.0, 0])
+    timing[0] += seconds
+    timing[1] += count
+
+
+def normalize(sql):
+    # One entry per statement shape: `IN (?, ?, ?)` lists of any length match
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+
+
+def parameter_shape(params):
+    # Types only: values may be passwords or customer details
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def record_slow_query(db, sql, params, many, seconds):
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else []
+        params = rows[0] if rows else ()
+        shape = {"rows": len(rows) if rows else None, "row": parameter_shape(params)}
+    else:
+        shape = parameter_shape(params)
+
+    # Run on a plain cursor, so capturing the plan is not itself timed
+    try:
+        plan = [row[3] for row in sqlite3.Connection.execute(db, f"EXPLAIN QUERY PLAN {sql}", params)]
+    except sqlite3.Error:
+        plan = None
+
+    entry = {
+        "time": int(time.time()),
+        "duration_ms": round(seconds * 1000, 3),
+        "sql": normalize(sql),
+        "parameters": shape,
+        "method": request.method if has_request_context() else None,
+        "route": request.url_rule.rule if has_request_context() and request.url_rule else None,
+        "user": session.get("username") if has_request_context() else None,
+        "plan": plan,
+    }
+    with slow_queries_lock:
+        slow_queries.append(entry)
+
+    warning(f"Slow query ({entry['duration_ms']} ms on {entry['route']}): {entry['sql']}")
+
+
+class TimedCursor(sqlite3.Cursor):
+    # SQLite does most of a query's work while stepping through its rows, so
+    # fetches count towards SQL time too. `connection.timing` is the request's
+    # [seconds, statements] while the connection is borrowed, None otherwise;
+    # statements slower than INVENTORY_DB_SLOW_QUERY_MS to execute (fetches
+    # not included) are logged with their plan
+    def execute(self, sql, params=()):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.execute(self, sql, params)
+        finally:
+            elapsed = perf_counter() - started
+            if (timing := self.connection.timing) is not None:
+                timing[0] += elapsed
+                timing[1] += 1
+            if elapsed >= slow_query:
+                record_slow_query(self.connection, sql, params, False, elapsed)
+
+    def executemany(self, sql, params):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.executemany(self, sql, params)
+        finally:
+            elapsed = perf_counter() - started
+            if (timing := self.connection.timing) is not None:
+                timing[0] += elapsed
+                timing[1] += 1
+            if elapsed >= slow_query:
+                record_slow_query(self.connection, sql, params, True, elapsed)
+
+    def executescript(self, *args):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.executescript(self, *args)
+        finally:
+            if (timing := self.connection.timing) is not None:
+                timing[0] += perf_counter() - started
+                timing[1] += 1
+
+    def fetchone(self):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.fetchone(self)
+        finally:
+            if (timing := self.connection.timing) is not None:
+                timing[0] += perf_counter() - started
+
+    def fetchmany(self, *args):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.fetchmany(self, *args)
+        finally:
+            if (timing := self.connection.timing) is not None:
+                timing[0] += perf_counter() - started
+
+    def fetchall(self):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.fetchall(self)
+        finally:
+            if (timing := self.connection.timing) is not None:
+                timing[0] += perf_counter() - started
+
+    def __next__(self):
+        started = perf_counter()
+        try:
+            return sqlite3.Cursor.__next__(self)
+        finally:
+            if (timing := self.connection.timing) is not None:
+                timing[0] += perf_counter() - started
+
+
+class TimedConnection(sqlite3.Connection):
+    timing = None
+
+    # sqlite3.Connection.execute() and friends create their cursors in C,
+    # bypassing cursor(), so they are routed through a TimedCursor here
+    def cursor(self, factory=TimedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+    def commit(self):
+        started = perf_counter()
+        try:
+            return sqlite3.Connection.commit(self)
+        finally:
+            if self.timing is not None:
+                self.timing[0] += perf_counter() - started
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        started = perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_timing("json", perf_counter() - started)
@@ -1,23 +1,42 @@
 from .app import *
+from .etags import conditional
 from .login import privileged
+from .lookup import lookup, requested_ids
+from .pagination import fetch_page, parse_fields
+from .passwords import hash_password
+
+
+USER_COLUMNS = ("id", "username", "role")
 
 
 @app.get("/api/users")
 @privileged("r")
+@conditional("users", cache=True)
 def get_users():
+    fields = parse_fields(USER_COLUMNS)
     with get_database() as db:
-        rows = db.execute(
-            """
-            SELECT id, username, role
-            FROM users;
-            """
-        ).fetchall()
+        if "ids" in request.args:
+            return lookup(db, "users", fields, requested_ids())
+
+        return fetch_page(
+            db,
+            f"SELECT {', '.join(fields)} FROM users",
+            filters={"role": ("role = ?", str)},
+            sorts={"username": str},
+        )
+
 
-    return [dict(row) for row in rows]
+@app.post("/api/users/lookup")
+@privileged("r")
+def lookup_users():
+    fields = parse_fields(USER_COLUMNS)
+    with get_database() as db:
+        return lookup(db, "users", fields, requested_ids())
 
 
 @app.get("/api/users/<int:user_id>")
 @privileged("r")
+@conditional("users", cache=True)
 def get_user(user_id):
     with get_database() as db:
         row = db.execute(
@@ -61,7 +80,7 @@ def create_user():
                 INSERT INTO users (username, password_hash, role)
                 VALUES (?, ?, ?);
                 """,
-                (username, bcrypt.generate_password_hash(password).decode(), role),
+                (username, hash_password(password), role),
             )
             user_id = cursor.lastrowid
         except sqlite3.IntegrityError as e:
@@ -87,7 +106,7 @@ def update_user(user_id):
         values.append(data["username"])
     if "password" in data:
         fields.append("password_hash = ?")
-        values.append(bcrypt.generate_password_hash(data["password"]).decode())
+        values.append(hash_password(data["password"]))
     if "role" in data:
         if data["role"] not in {"r", "w", "a", "d"}:
             return {"message": "Invalid role!"}, 400
@@ -0,0 +1,105 @@
+from concurrent.futures import Future
+import contextvars
+from importlib import import_module
+import queue
+import threading
+import time
+
+from .app import *
+
+
+WRITE_WINDOW_MS = float(os.environ.get("INVENTORY_DB_WRITE_WINDOW_MS", 2))
+WRITE_BATCH = int(os.environ.get("INVENTORY_DB_WRITE_BATCH", 500))
+
+# Looked up on every batch rather than imported, so the plan check's
+# temporary pool is honoured
+core = import_module(".app", __package__)
+
+# Write units waiting for the writer: (future, context, func, args)
+pending = queue.Queue()
+writer = None
+writer_lock = threading.Lock()
+
+
+def write(func, *args):
+    # Runs func(db, *args) in the writer thread, grouped with other requests'
+    # units into one transaction, and returns its result once committed. An
+    # exception raised by func (say an IntegrityError) only undoes that unit
+    # and is re-raised here. Units must not commit or roll back themselves;
+    # they run in the caller's context, so the slow-query log still sees the
+    # request that submitted them.
+    start_writer()
+
+    future = Future()
+    started = time.perf_counter()
+    pending.put((future, contextvars.copy_context(), func, args))
+    try:
+        return future.result()
+    finally:
+        record_timing("write", time.perf_counter() - started)
+
+
+def start_writer():
+    # Started lazily, so every forked worker process gets its own writer
+    global writer
+    if writer is not None and writer.is_alive():
+        return
+
+    with writer_lock:
+        if writer is None or not writer.is_alive():
+            writer = threading.Thread(target=run_writer, name="writer", daemon=True)
+            writer.start()
+
+
+def next_batch():
+    # Blocks for the first unit, then gathers whatever arrives within the
+    # window; units queued during the previous commit are picked up at once
+    batch = [pending.get()]
+    deadline = time.monotonic() + WRITE_WINDOW_MS / 1000
+    while len(batch) < WRITE_BATCH:
+        try:
+            batch.append(pending.get(timeout=max(0, deadline - time.monotonic())))
+        except queue.Empty:
+            break
+
+    return batch
+
+
+def commit_batch(batch):
+    pool = core.pool
+    db = pool.acquire()
+    results = []
+    try:
+        db.execute("BEGIN IMMEDIATE;")
+        for future, context, func, args in batch:
+            db.execute("SAVEPOINT unit;")
+            try:
+                results.append((future, context.run(func, db, *args), None))
+                db.execute("RELEASE unit;")
+            except Exception as e:
+                db.execute("ROLLBACK TO unit;")
+                db.execute("RELEASE unit;")
+                results.append((future, None, e))
+
+        db.commit()
+    finally:
+        pool.release(db)
+
+    # Only now is every unit durable
+    for future, result, error in results:
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+
+def run_writer():
+    while True:
+        batch = next_batch()
+        try:
+            commit_batch(batch)
+        except Exception as e:
+            # The transaction itself failed (the database stayed locked, the
+            # disk is full, ...); every unit in it shares the error
+            for future, *_ in batch:
+                future.set_exception(e)
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from .generate import DEFAULT_SIZES, generate
+from .run import HttpClient, TestClient, read_context, run
+from .scenarios import SCENARIOS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m bench",
+        description="Generates a synthetic shop and times every API endpoint against it.",
+    )
+    parser.add_argument("--db", help="Database to benchmark; generated here if it does not exist yet.")
+    for name, default in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{name}", type=int, default=default, help=f"Rows to generate (default {default}).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Simultaneous clients.")
+    parser.add_argument("--only", action="append", help="Scenario or endpoint to run; repeatable.")
+    parser.add_argument("--http", metavar="URL", help="Benchmark a running server instead; --db must be its database.")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    return parser.parse_args()
+
+
+def create_database(path, sizes, seed):
+    from app.migrations import migrate
+    from app.pool import ConnectionPool
+
+    pool = ConnectionPool(path, size=1)
+    migrate(pool)
+    db = pool.connect()
+    try:
+        return generate(db, sizes, seed)
+    finally:
+        db.close()
+        pool.close()
+
+
+def copy_database(source, target):
+    # The backup API copies a consistent snapshot, WAL included
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def main():
+    args = parse_args()
+    if args.http and not (args.db and os.path.exists(args.db)):
+        sys.exit("--http needs --db pointing at the server's database.")
+
+    workdir = tempfile.mkdtemp(prefix="inventory-bench-")
+    path = args.db or os.path.join(workdir, "seed.sqlite")
+    working = os.path.join(workdir, "bench.sqlite")
+
+    # The app reads its configuration on import, so this comes first; writes
+    # go to a copy of the database, so every run starts from the same data
+    os.environ["INVENTORY_DB_PATH"] = path if args.http else working
+    os.environ["INVENTORY_DB_MIGRATE"] = "0"
+    os.environ["INVENTORY_DB_CHECKPOINT_INTERVAL"] = "0"
+
+    try:
+        sizes = None
+        if not os.path.exists(path):
+            sizes = {name: getattr(args, name) for name in DEFAULT_SIZES}
+            print(f"Generating {path}...", file=sys.stderr)
+            sizes = create_database(path, sizes, args.seed)
+
+        ctx = read_context(path)
+        if args.http:
+            mode = args.http
+            make_client = lambda: HttpClient(args.http)
+        else:
+            mode = "in-process"
+            copy_database(path, working)
+
+            from app import app, migrations, pool
+
+            migrations.migrate(pool)
+            make_client = lambda: TestClient(app)
+
+        results = run(make_client, ctx, args.requests, args.concurrency, args.seed, args.only)
+
+        report = {
+            "meta": {
+                "seed": args.seed,
+                "sizes": sizes or "existing database",
+                "target": mode,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+            },
+            "scenarios": results,
+        }
+
+        if not args.http:
+            covered = {endpoint for _, endpoint, *_ in SCENARIOS}
+            report["uncovered"] = sorted(
+                rule.endpoint
+                for rule in app.url_map.iter_rules()
+                if rule.rule.startswith("/api") and rule.endpoint not in covered
+            )
+            pool.close()
+
+        output = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w") as out:
+                out.write(output + "\n")
+        else:
+            print(output)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+main()
@@ -0,0 +1,188 @@
+import bisect
+import itertools
+import math
+import random
+import time
+
+
+DEFAULT_SIZES = {
+    "categories": 50,
+    "products": 5000,
+    "customers": 2000,
+    "users": 10,
+    "sales": 20000,
+    "logs": 5000,
+    "days": 90,
+}
+
+SYLLABLES = [
+    "ba", "be", "bo", "ca", "co", "da", "de", "fa", "fi", "ga", "go", "ka", "ki",
+    "la", "li", "lo", "ma", "me", "mi", "na", "ne", "no", "pa", "pe", "ra", "re",
+    "ri", "sa", "se", "so", "ta", "te", "to", "va", "ve", "za", "zo",
+]
+CITIES = 50
+
+# Share of sales per hour of the day (UTC); shops are busiest around noon
+# and in the early evening
+HOUR_WEIGHTS = [
+    1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 16, 18, 20, 18, 15, 14, 15, 17, 18, 14, 9, 5, 3, 2,
+]
+
+
+def zipf_weights(n, s=1.1):
+    # Popularity by rank: a few best sellers, a long tail
+    return list(itertools.accumulate(1 / (rank**s) for rank in range(1, n + 1)))
+
+
+def pick(rng, cumulative):
+    return bisect.bisect(cumulative, rng.random() * cumulative[-1]) + 1
+
+
+def geometric(rng, p):
+    return int(math.log(1 - rng.random()) / math.log(1 - p))
+
+
+def make_words(rng, count):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def generate(db, sizes=None, seed=0, now=None):
+    # Fills a freshly migrated database; ids are assigned explicitly, so the
+    # same seed and sizes always produce the same rows. Returns the sizes used.
+    sizes = {**DEFAULT_SIZES, **(sizes or {})}
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    start = now - sizes["days"] * 86400
+    words = make_words(rng, 2000)
+
+    db.executemany(
+        "INSERT INTO categories (id, name, description) VALUES (?, ?, ?);",
+        [
+            (i, f"{rng.choice(words).title()} {i}", " ".join(rng.choices(words, k=6)))
+            for i in range(1, sizes["categories"] + 1)
+        ],
+    )
+
+    category_weights = zipf_weights(sizes["categories"], 0.8)
+    products = []
+    for i in range(1, sizes["products"] + 1):
+        products.append(
+            (
+                i,
+                f"SKU-{i:07d}",
+                int(rng.random() < 0.95),
+                " ".join(rng.choices(words, k=rng.randint(1, 3))).title(),
+                max(1, int(rng.lognormvariate(math.log(500), 1))),
+                " ".join(rng.choices(words, k=rng.randint(0, 12))) or None,
+                pick(rng, category_weights) if rng.random() < 0.9 else None,
+            )
+        )
+    db.executemany(
+        """
+        INSERT INTO products (id, sku, active, name, price_cents, description, category_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?);
+        """,
+        products,
+    )
+
+    city_weights = zipf_weights(CITIES)
+    customers = []
+    for i in range(1, sizes["customers"] + 1):
+        name = f"{rng.choice(words).title()} {rng.choice(words).title()}"
+        customers.append(
+            (
+                i,
+                name,
+                f"{name.replace(' ', '.').lower()}.{i}@example.com",
+                f"555-{rng.randint(0, 9999):04d}",
+                f"City {pick(rng, city_weights)}",
+                "XX",
+            )
+        )
+    db.executemany(
+        """
+        INSERT INTO customers (id, name, email, phone, city, country)
+        VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        customers,
+    )
+
+    # Cashiers share one (valid) hash; their passwords are never used
+    admin_hash = db.execute("SELECT password_hash FROM users WHERE username = 'admin';").fetchone()[0]
+    db.executemany(
+        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?);",
+        [
+            (f"cashier{i}", admin_hash, "w" if i % 4 else "r")
+            for i in range(1, sizes["users"] + 1)
+        ],
+    )
+    user_ids = [row[0] for row in db.execute("SELECT id FROM users;")]
+
+    # Sales first, in memory, so the opening stock can cover every sale
+    product_weights = zipf_weights(sizes["products"])
+    customer_weights = zipf_weights(sizes["customers"], 0.7)
+    sold = [0] * (sizes["products"] + 1)
+    sales = []
+    for i in range(1, sizes["sales"] + 1):
+        day = rng.randrange(sizes["days"])
+        hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+        sale_time = start + day * 86400 + hour * 3600 + rng.randrange(3600)
+        customer_id = pick(rng, customer_weights) if rng.random() < 0.7 else None
+        lines = {}
+        for _ in range(1 + min(geometric(rng, 0.45), 19)):
+            product_id = pick(rng, product_weights)
+            lines[product_id] = lines.get(product_id, 0) + 1 + geometric(rng, 0.6)
+        for product_id, quantity in lines.items():
+            sold[product_id] += quantity
+        sales.append((sale_time, customer_id, rng.choice(user_ids), lines))
+    sales.sort(key=lambda sale: sale[0])
+
+    # Other stock movements: damages, returns, adjustments
+    movements = []
+    lost = [0] * (sizes["products"] + 1)
+    for _ in range(sizes["logs"]):
+        product_id = pick(rng, product_weights)
+        type_ = rng.choices("drao", weights=(5, 3, 2, 1))[0]
+        delta = rng.randint(1, 3) * (1 if type_ == "r" else -1)
+        lost[product_id] -= min(delta, 0)
+        movements.append((start + rng.randrange(sizes["days"] * 86400), type_, product_id, delta))
+
+    logs = [
+        (start - 1, "f", product_id, sold[product_id] + lost[product_id] + rng.randint(0, 200))
+        for product_id in range(1, sizes["products"] + 1)
+    ]
+    logs.extend(movements)
+    log_id = len(logs)
+    db.executemany(
+        "INSERT INTO inventory_logs (time, type, product_id, delta) VALUES (?, ?, ?, ?);",
+        logs,
+    )
+
+    sale_rows = []
+    sale_logs = []
+    details = []
+    for sale_id, (sale_time, customer_id, user_id, lines) in enumerate(sales, 1):
+        sale_rows.append((sale_id, sale_time, customer_id, user_id))
+        for product_id, quantity in lines.items():
+            log_id += 1
+            sale_logs.append((log_id, sale_time, "s", product_id, -quantity))
+            details.append((products[product_id - 1][4] * quantity, sale_id, log_id))
+
+    db.executemany(
+        "INSERT INTO sales (id, time, customer_id, user_id) VALUES (?, ?, ?, ?);",
+        sale_rows,
+    )
+    db.executemany(
+        "INSERT INTO inventory_logs (id, time, type, product_id, delta) VALUES (?, ?, ?, ?, ?);",
+        sale_logs,
+    )
+    db.executemany(
+        "INSERT INTO sales_details (subtotal_cents, sale_id, log_id) VALUES (?, ?, ?);",
+        details,
+    )
+    db.commit()
+
+    return sizes
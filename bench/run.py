@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import random
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+from .scenarios import SCENARIOS
+
+
+class TestClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, url, body=None):
+        if isinstance(body, str):
+            kwargs = {"data": body, "content_type": "application/x-ndjson"}
+        elif body is not None:
+            kwargs = {"json": body}
+        else:
+            kwargs = {}
+
+        response = self.client.open(url, method=method, **kwargs)
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    # One keep-alive connection and session cookie per simulated terminal
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection(parts.hostname, parts.port, timeout=120)
+        self.cookie = None
+
+    def request(self, method, url, body=None):
+        headers = {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if isinstance(body, str):
+            headers["Content-Type"] = "application/x-ndjson"
+            body = body.encode()
+        elif body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(body).encode()
+
+        self.connection.request(method, url, body=body, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+
+        return response.status, data
+
+
+def read_context(path):
+    # Id ranges and search words from the database under test
+    db = sqlite3.connect(path)
+    try:
+        max_ids = {
+            table: db.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table};").fetchone()[0]
+            for table in ("products", "categories", "customers", "users", "inventory_logs", "sales", "changes")
+        }
+        time_range = db.execute("SELECT MIN(time), MAX(time) FROM sales;").fetchone()
+        words = sorted(
+            {
+                word.lower()
+                for (name,) in db.execute("SELECT name FROM products ORDER BY id LIMIT 1000;")
+                for word in name.split()
+                if len(word) >= 4
+            }
+        )
+    finally:
+        db.close()
+
+    now = int(time.time())
+    return {
+        "max_ids": max_ids,
+        "time_range": (time_range[0] or now - 86400, time_range[1] or now),
+        "words": words or ["bench"],
+        "created": {table: [] for table in max_ids},
+    }
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+        **{
+            f"p{int(fraction * 100)}_ms": round(percentile(ordered, fraction) * 1000, 3) if ordered else None
+            for fraction in (0.5, 0.95, 0.99)
+        },
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+    }
+
+
+def run_phase(clients, factory, method, count, ctx, seed, record):
+    # Spreads `count` requests over the clients, one thread per client
+    def worker(index):
+        rng = random.Random(f"{seed}:{index}")
+        latencies = []
+        errors = 0
+        for _ in range(index, count, len(clients)):
+            request = factory(rng, ctx)
+            if request is None:
+                break
+
+            url, body = request
+            started = time.perf_counter()
+            status, data = clients[index].request(method, url, body)
+            latencies.append(time.perf_counter() - started)
+
+            if status >= 400:
+                errors += 1
+            elif record:
+                ctx["created"][record].append(json.loads(data)["id"])
+
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        results = list(executor.map(worker, range(len(clients))))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    return summarize(latencies, sum(result[1] for result in results), elapsed)
+
+
+def run(make_client, ctx, requests=200, concurrency=1, seed=0, only=None):
+    # Logs every client in, then times each scenario as its own phase;
+    # returns per-scenario statistics keyed by scenario name
+    clients = [make_client() for _ in range(concurrency)]
+    for client in clients:
+        status, data = client.request("POST", "/api/login", {"username": "admin", "password": "admin"})
+        if status != 200:
+            raise RuntimeError(f"Could not log in: {status} {data[:200]!r}")
+
+    results = {}
+    for name, endpoint, method, factory, options in SCENARIOS:
+        if only and name not in only and endpoint not in only:
+            continue
+
+        count = min(requests, options.get("limit", requests))
+        stats = run_phase(clients, factory, method, count, ctx, f"{seed}:{name}", options.get("record"))
+        results[name] = {"endpoint": endpoint, "method": method, **stats}
+
+    return results
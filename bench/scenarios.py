@@ -0,0 +1,354 @@
+import uuid
+
+
+# (name, Flask endpoint, method, request factory, options). Factories take
+# (rng, ctx) and return (url, body) or None when there is nothing to do.
+# They run in this order, each as its own timed phase: reads first, then
+# creates, updates, and deletes of the rows created earlier. Options:
+# `record` keeps created ids for later phases, `limit` caps slow ones.
+SCENARIOS = []
+
+
+def scenario(endpoint, method="GET", name=None, **options):
+    def decorator(factory):
+        SCENARIOS.append((name or endpoint, endpoint, method, factory, options))
+        return factory
+
+    return decorator
+
+
+def any_id(rng, ctx, table):
+    return rng.randint(1, max(1, ctx["max_ids"][table]))
+
+
+def recent_time(rng, ctx):
+    return rng.randint(ctx["time_range"][0], ctx["time_range"][1])
+
+
+def unique():
+    return uuid.uuid4().hex[:12]
+
+
+# Reads
+
+@scenario("get_products")
+def get_products(rng, ctx):
+    return "/api/products?limit=100", None
+
+
+@scenario("get_products", name="get_products_filtered")
+def get_products_filtered(rng, ctx):
+    return f"/api/products?category_id={any_id(rng, ctx, 'categories')}&active=1&sort=-price_cents&limit=50", None
+
+
+@scenario("get_product")
+def get_product(rng, ctx):
+    return f"/api/products/{any_id(rng, ctx, 'products')}", None
+
+
+@scenario("search_products")
+def search_products(rng, ctx):
+    word = rng.choice(ctx["words"])
+    return f"/api/products/search?q={word[:rng.randint(2, 4)]}", None
+
+
+@scenario("get_product_stock")
+def get_product_stock(rng, ctx):
+    return f"/api/products/{any_id(rng, ctx, 'products')}/stock?at={recent_time(rng, ctx)}", None
+
+
+@scenario("get_products_stock")
+def get_products_stock(rng, ctx):
+    return f"/api/products/stock?at={recent_time(rng, ctx)}&limit=100", None
+
+
+@scenario("get_categories")
+def get_categories(rng, ctx):
+    return "/api/categories?sort=name", None
+
+
+@scenario("get_category")
+def get_category(rng, ctx):
+    return f"/api/categories/{any_id(rng, ctx, 'categories')}", None
+
+
+@scenario("get_customers")
+def get_customers(rng, ctx):
+    return f"/api/customers?city=City+{rng.randint(1, 10)}&limit=50", None
+
+
+@scenario("get_customer")
+def get_customer(rng, ctx):
+    return f"/api/customers/{any_id(rng, ctx, 'customers')}", None
+
+
+@scenario("search_customers")
+def search_customers(rng, ctx):
+    return f"/api/customers/search?q={rng.choice(ctx['words'])[:3]}", None
+
+
+@scenario("get_users")
+def get_users(rng, ctx):
+    return "/api/users", None
+
+
+@scenario("get_user")
+def get_user(rng, ctx):
+    return f"/api/users/{any_id(rng, ctx, 'users')}", None
+
+
+@scenario("get_logs")
+def get_logs(rng, ctx):
+    return f"/api/logs?product_id={any_id(rng, ctx, 'products')}&sort=-time&limit=50", None
+
+
+# The same large page as objects, projected, and in columns
+@scenario("get_logs", name="get_logs_full_page")
+def get_logs_full_page(rng, ctx):
+    return "/api/logs?limit=1000", None
+
+
+@scenario("get_logs", name="get_logs_fields")
+def get_logs_fields(rng, ctx):
+    return "/api/logs?limit=1000&fields=product_id,delta", None
+
+
+@scenario("get_logs", name="get_logs_columns")
+def get_logs_columns(rng, ctx):
+    return "/api/logs?limit=1000&format=columns", None
+
+
+@scenario("get_log")
+def get_log(rng, ctx):
+    return f"/api/logs/{any_id(rng, ctx, 'inventory_logs')}", None
+
+
+@scenario("export_logs")
+def export_logs(rng, ctx):
+    return f"/api/logs/export?since_id={max(0, ctx['max_ids']['inventory_logs'] - 1000)}", None
+
+
+@scenario("get_sales")
+def get_sales(rng, ctx):
+    return f"/api/sales?customer_id={any_id(rng, ctx, 'customers')}&limit=50", None
+
+
+@scenario("get_sales", name="get_sales_by_time")
+def get_sales_by_time(rng, ctx):
+    time_from = recent_time(rng, ctx)
+    return f"/api/sales?time_from={time_from}&time_to={time_from + 86400}&sort=-time", None
+
+
+@scenario("get_sales", name="get_sales_expanded")
+def get_sales_expanded(rng, ctx):
+    time_from = recent_time(rng, ctx)
+    return f"/api/sales?time_from={time_from}&limit=50&expand=details,customer,user,product", None
+
+
+@scenario("get_sale")
+def get_sale(rng, ctx):
+    return f"/api/sales/{any_id(rng, ctx, 'sales')}", None
+
+
+@scenario("export_sales")
+def export_sales(rng, ctx):
+    return f"/api/sales/export?since_id={max(0, ctx['max_ids']['sales'] - 1000)}", None
+
+
+@scenario("export_sales_details")
+def export_sales_details(rng, ctx):
+    return f"/api/sales/details/export?since_time={ctx['time_range'][1] - 86400}&format=csv", None
+
+
+@scenario("get_overview")
+def get_overview(rng, ctx):
+    return "/api/overview", None
+
+
+@scenario("get_sales_report")
+def get_sales_report(rng, ctx):
+    bucket = rng.choice(["hour", "day", "month"])
+    group_by = rng.choice(["", "&group_by=product", "&group_by=category", "&group_by=customer"])
+    return f"/api/reports/sales?bucket={bucket}&from={ctx['time_range'][0]}{group_by}", None
+
+
+@scenario("get_changes")
+def get_changes(rng, ctx):
+    return f"/api/changes?after={max(0, ctx['max_ids']['changes'] - 100)}", None
+
+
+@scenario("get_cache_stats")
+def get_cache_stats(rng, ctx):
+    return "/api/cache", None
+
+
+@scenario("get_metrics")
+def get_metrics(rng, ctx):
+    return "/api/metrics", None
+
+
+@scenario("get_slow_queries")
+def get_slow_queries(rng, ctx):
+    return "/api/slow-queries", None
+
+
+def some_ids(rng, ctx, table, count):
+    return [any_id(rng, ctx, table) for _ in range(count)]
+
+
+for endpoint, table, path in (
+    ("lookup_products", "products", "/api/products/lookup"),
+    ("lookup_customers", "customers", "/api/customers/lookup"),
+    ("lookup_categories", "categories", "/api/categories/lookup"),
+    ("lookup_users", "users", "/api/users/lookup"),
+    ("lookup_logs", "inventory_logs", "/api/logs/lookup"),
+    ("lookup_sales", "sales", "/api/sales/lookup"),
+):
+    scenario(endpoint, "POST")(
+        lambda rng, ctx, table=table, path=path: (path, {"ids": some_ids(rng, ctx, table, 200)})
+    )
+
+
+@scenario("get_products", name="get_products_by_ids")
+def get_products_by_ids(rng, ctx):
+    return f"/api/products?ids={','.join(map(str, some_ids(rng, ctx, 'products', 50)))}", None
+
+
+@scenario("get_current_user")
+def get_current_user(rng, ctx):
+    return "/api/me", None
+
+
+# Creates
+
+@scenario("create_category", "POST", record="categories")
+def create_category(rng, ctx):
+    return "/api/categories", {"name": f"Bench {unique()}"}
+
+
+@scenario("create_customer", "POST", record="customers")
+def create_customer(rng, ctx):
+    name = unique()
+    return "/api/customers", {"name": name, "email": f"{name}@example.com", "city": "Bench"}
+
+
+@scenario("create_product", "POST", record="products")
+def create_product(rng, ctx):
+    return "/api/products", {"name": f"Bench {unique()}", "active": True, "price_cents": rng.randint(50, 5000)}
+
+
+@scenario("create_user", "POST", record="users", limit=20)
+def create_user(rng, ctx):
+    return "/api/users", {"username": f"bench{unique()}", "password": "bench", "role": "r"}
+
+
+@scenario("create_log", "POST", record="inventory_logs")
+def create_log(rng, ctx):
+    return "/api/logs", {"type": "f", "product_id": any_id(rng, ctx, "products"), "delta": rng.randint(1, 10)}
+
+
+def sale_body(rng, ctx):
+    return {
+        "customer_id": any_id(rng, ctx, "customers"),
+        "details": [
+            {"product_id": product_id, "quantity": 1, "subtotal_cents": 100}
+            for product_id in {any_id(rng, ctx, "products") for _ in range(rng.randint(1, 3))}
+        ],
+    }
+
+
+@scenario("create_sale", "POST", record="sales")
+def create_sale(rng, ctx):
+    return "/api/sales", sale_body(rng, ctx)
+
+
+@scenario("create_sales_batch", "POST", limit=50)
+def create_sales_batch(rng, ctx):
+    return "/api/sales/batch", {"sales": [sale_body(rng, ctx) for _ in range(20)]}
+
+
+@scenario("import_products", "POST", limit=50)
+def import_products(rng, ctx):
+    rows = [
+        f'{{"sku": "SKU-{any_id(rng, ctx, "products"):07d}", "price_cents": {rng.randint(50, 5000)}}}'
+        for _ in range(200)
+    ]
+    return "/api/products/import", "\n".join(rows)
+
+
+@scenario("import_customers", "POST", limit=50)
+def import_customers(rng, ctx):
+    rows = [
+        f'{{"email": "{unique()}@example.com", "name": "Imported", "city": "Bench"}}'
+        for _ in range(200)
+    ]
+    return "/api/customers/import", "\n".join(rows)
+
+
+# Updates
+
+@scenario("update_product", "PATCH")
+def update_product(rng, ctx):
+    return f"/api/products/{any_id(rng, ctx, 'products')}", {"price_cents": rng.randint(50, 5000)}
+
+
+@scenario("update_category", "PATCH")
+def update_category(rng, ctx):
+    return f"/api/categories/{any_id(rng, ctx, 'categories')}", {"description": unique()}
+
+
+@scenario("update_customer", "PATCH")
+def update_customer(rng, ctx):
+    return f"/api/customers/{any_id(rng, ctx, 'customers')}", {"phone": f"555-{rng.randint(0, 9999):04d}"}
+
+
+@scenario("update_user", "PATCH")
+def update_user(rng, ctx):
+    if not ctx["created"]["users"]:
+        return None
+    return f"/api/users/{rng.choice(ctx['created']['users'])}", {"role": rng.choice("rw")}
+
+
+@scenario("update_log", "PATCH")
+def update_log(rng, ctx):
+    return f"/api/logs/{any_id(rng, ctx, 'inventory_logs')}", {"note": unique()}
+
+
+# Deletes, of rows created above
+
+def created(ctx, table):
+    try:
+        return ctx["created"][table].pop()
+    except IndexError:
+        return None
+
+
+def delete(table, path):
+    def factory(rng, ctx):
+        row_id = created(ctx, table)
+        return None if row_id is None else (f"{path}/{row_id}", None)
+
+    return factory
+
+
+for endpoint, table, path in (
+    ("delete_sale", "sales", "/api/sales"),
+    ("delete_log", "inventory_logs", "/api/logs"),
+    ("delete_product", "products", "/api/products"),
+    ("delete_customer", "customers", "/api/customers"),
+    ("delete_category", "categories", "/api/categories"),
+    ("delete_user", "users", "/api/users"),
+):
+    scenario(endpoint, "DELETE")(delete(table, path))
+
+
+# Sessions last, since logging out ends the client's session
+
+@scenario("login", "POST", limit=20)
+def login(rng, ctx):
+    return "/api/login", {"username": "admin", "password": "admin"}
+
+
+@scenario("logout", "POST")
+def logout(rng, ctx):
+    return "/api/logout", None
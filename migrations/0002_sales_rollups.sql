@@ -0,0 +1,206 @@
+-------------------------------------------------------
+-- Sales rollups, kept current by triggers for reports --
+-------------------------------------------------------
+
+-- Buckets are UTC hours (`h`) and days (`d`); months are summed from days.
+-- Missing customers, users and products are stored as 0 so they can be
+-- part of the primary key.
+
+CREATE TABLE IF NOT EXISTS sales_rollup (
+    period TEXT NOT NULL,
+    bucket INTEGER NOT NULL, -- Unix time of the start of the bucket
+    customer_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    sales_count INTEGER NOT NULL DEFAULT (0),
+    revenue_cents INTEGER NOT NULL DEFAULT (0),
+
+    PRIMARY KEY (period, bucket, customer_id, user_id),
+    CONSTRAINT period_check CHECK (period IN ('h', 'd'))
+) WITHOUT ROWID;
+
+-- Only sale lines tied to a product (through their inventory log)
+CREATE TABLE IF NOT EXISTS sales_product_rollup (
+    period TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT (0),
+    revenue_cents INTEGER NOT NULL DEFAULT (0),
+
+    PRIMARY KEY (period, bucket, product_id),
+    CONSTRAINT period_check CHECK (period IN ('h', 'd'))
+) WITHOUT ROWID;
+
+INSERT INTO sales_rollup (period, bucket, customer_id, user_id, sales_count, revenue_cents)
+SELECT p.column1, s.time - s.time % p.column2, COALESCE(s.customer_id, 0), COALESCE(s.user_id, 0),
+    COUNT(*), SUM(s.total_cents)
+FROM sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+GROUP BY 1, 2, 3, 4;
+
+INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+SELECT p.column1, s.time - s.time % p.column2, il.product_id, SUM(-il.delta), SUM(sd.subtotal_cents)
+FROM sales_details AS sd
+    JOIN inventory_logs AS il ON (il.id = sd.log_id)
+    JOIN sales AS s ON (s.id = sd.sale_id),
+    (VALUES ('h', 3600), ('d', 86400)) AS p
+GROUP BY 1, 2, 3;
+
+-- Sale headers: count and revenue per customer and user
+
+CREATE TRIGGER IF NOT EXISTS rollup_insert_sale
+AFTER INSERT ON sales
+BEGIN
+    INSERT INTO sales_rollup (period, bucket, customer_id, user_id, sales_count, revenue_cents)
+    SELECT column1, NEW.time - NEW.time % column2, COALESCE(NEW.customer_id, 0),
+        COALESCE(NEW.user_id, 0), 1, NEW.total_cents
+    FROM (VALUES ('h', 3600), ('d', 86400)) WHERE true
+    ON CONFLICT (period, bucket, customer_id, user_id) DO UPDATE
+    SET sales_count = sales_count + excluded.sales_count,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_delete_sale
+AFTER DELETE ON sales
+BEGIN
+    INSERT INTO sales_rollup (period, bucket, customer_id, user_id, sales_count, revenue_cents)
+    SELECT column1, OLD.time - OLD.time % column2, COALESCE(OLD.customer_id, 0),
+        COALESCE(OLD.user_id, 0), -1, -OLD.total_cents
+    FROM (VALUES ('h', 3600), ('d', 86400)) WHERE true
+    ON CONFLICT (period, bucket, customer_id, user_id) DO UPDATE
+    SET sales_count = sales_count + excluded.sales_count,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+-- Fires for every subtotal change as well as reassigned customers/users
+CREATE TRIGGER IF NOT EXISTS rollup_update_sale
+AFTER UPDATE OF time, total_cents, customer_id, user_id ON sales
+BEGIN
+    INSERT INTO sales_rollup (period, bucket, customer_id, user_id, sales_count, revenue_cents)
+    SELECT column1, OLD.time - OLD.time % column2, COALESCE(OLD.customer_id, 0),
+        COALESCE(OLD.user_id, 0), -1, -OLD.total_cents
+    FROM (VALUES ('h', 3600), ('d', 86400)) WHERE true
+    ON CONFLICT (period, bucket, customer_id, user_id) DO UPDATE
+    SET sales_count = sales_count + excluded.sales_count,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+
+    INSERT INTO sales_rollup (period, bucket, customer_id, user_id, sales_count, revenue_cents)
+    SELECT column1, NEW.time - NEW.time % column2, COALESCE(NEW.customer_id, 0),
+        COALESCE(NEW.user_id, 0), 1, NEW.total_cents
+    FROM (VALUES ('h', 3600), ('d', 86400)) WHERE true
+    ON CONFLICT (period, bucket, customer_id, user_id) DO UPDATE
+    SET sales_count = sales_count + excluded.sales_count,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+-- Sale lines: quantity and revenue per product. A line only counts while
+-- its detail, inventory log and sale all exist, so every trigger joins the
+-- three and becomes a no-op when one of them is already gone. Deleting a
+-- log or a sale is handled BEFORE the row disappears, because the foreign
+-- key actions on sales_details run before any AFTER trigger of the parent.
+
+CREATE TRIGGER IF NOT EXISTS rollup_insert_detail
+AFTER INSERT ON sales_details
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, il.product_id, -il.delta, NEW.subtotal_cents
+    FROM inventory_logs AS il, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE il.id = NEW.log_id AND s.id = NEW.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_delete_detail
+AFTER DELETE ON sales_details
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, il.product_id, il.delta, -OLD.subtotal_cents
+    FROM inventory_logs AS il, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE il.id = OLD.log_id AND s.id = OLD.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_update_detail
+AFTER UPDATE ON sales_details
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, il.product_id, il.delta, -OLD.subtotal_cents
+    FROM inventory_logs AS il, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE il.id = OLD.log_id AND s.id = OLD.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, il.product_id, -il.delta, NEW.subtotal_cents
+    FROM inventory_logs AS il, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE il.id = NEW.log_id AND s.id = NEW.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_delete_log
+BEFORE DELETE ON inventory_logs
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, OLD.product_id, OLD.delta, -sd.subtotal_cents
+    FROM sales_details AS sd, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE sd.log_id = OLD.id AND s.id = sd.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_update_log
+AFTER UPDATE OF product_id, delta ON inventory_logs
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, OLD.product_id, OLD.delta, -sd.subtotal_cents
+    FROM sales_details AS sd, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE sd.log_id = OLD.id AND s.id = sd.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, s.time - s.time % p.column2, NEW.product_id, -NEW.delta, sd.subtotal_cents
+    FROM sales_details AS sd, sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE sd.log_id = NEW.id AND s.id = sd.sale_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_delete_sale_lines
+BEFORE DELETE ON sales
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, OLD.time - OLD.time % p.column2, il.product_id, il.delta, -sd.subtotal_cents
+    FROM sales_details AS sd, inventory_logs AS il, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE sd.sale_id = OLD.id AND il.id = sd.log_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_update_sale_lines
+AFTER UPDATE OF time ON sales
+BEGIN
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, OLD.time - OLD.time % p.column2, il.product_id, il.delta, -sd.subtotal_cents
+    FROM sales_details AS sd, inventory_logs AS il, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE sd.sale_id = NEW.id AND il.id = sd.log_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+
+    INSERT INTO sales_product_rollup (period, bucket, product_id, quantity, revenue_cents)
+    SELECT p.column1, NEW.time - NEW.time % p.column2, il.product_id, -il.delta, sd.subtotal_cents
+    FROM sales_details AS sd, inventory_logs AS il, (VALUES ('h', 3600), ('d', 86400)) AS p
+    WHERE sd.sale_id = NEW.id AND il.id = sd.log_id
+    ON CONFLICT (period, bucket, product_id) DO UPDATE
+    SET quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+END;
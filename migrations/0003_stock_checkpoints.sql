@@ -0,0 +1,55 @@
+-----------------------------
+-- Stock level checkpoints --
+-----------------------------
+
+-- A checkpoint records, for every product whose stock changed since the
+-- previous checkpoint, its quantity as of `time` (the sum of the deltas of
+-- all logs up to and including that time). Historical stock is the latest
+-- item at or before the requested time plus the logs after it.
+
+CREATE TABLE IF NOT EXISTS stock_checkpoints (
+    time INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS stock_checkpoint_items (
+    product_id INTEGER NOT NULL,
+    checkpoint_time INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+
+    PRIMARY KEY (product_id, checkpoint_time),
+    CONSTRAINT checkpoint_time_check FOREIGN KEY (checkpoint_time) REFERENCES stock_checkpoints(time)
+        ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS index_checkpoint_item_time ON stock_checkpoint_items(checkpoint_time);
+
+-- Logs written or changed after the fact (offline sales, corrections)
+-- are folded into every checkpoint taken at or after their time
+
+CREATE TRIGGER IF NOT EXISTS checkpoint_insert_log
+AFTER INSERT ON inventory_logs
+BEGIN
+    UPDATE stock_checkpoint_items
+    SET quantity = quantity + NEW.delta
+    WHERE product_id = NEW.product_id AND checkpoint_time >= NEW.time;
+END;
+
+CREATE TRIGGER IF NOT EXISTS checkpoint_delete_log
+AFTER DELETE ON inventory_logs
+BEGIN
+    UPDATE stock_checkpoint_items
+    SET quantity = quantity - OLD.delta
+    WHERE product_id = OLD.product_id AND checkpoint_time >= OLD.time;
+END;
+
+CREATE TRIGGER IF NOT EXISTS checkpoint_update_log
+AFTER UPDATE OF time, product_id, delta ON inventory_logs
+BEGIN
+    UPDATE stock_checkpoint_items
+    SET quantity = quantity - OLD.delta
+    WHERE product_id = OLD.product_id AND checkpoint_time >= OLD.time;
+
+    UPDATE stock_checkpoint_items
+    SET quantity = quantity + NEW.delta
+    WHERE product_id = NEW.product_id AND checkpoint_time >= NEW.time;
+END;
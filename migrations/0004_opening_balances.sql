@@ -0,0 +1,17 @@
+----------------------------
+-- Ledger opening balances --
+----------------------------
+
+-- Inventory logs older than the retention window are copied to the archive
+-- database and collapsed into one `a`djustment per product whose delta is
+-- the sum of everything it replaced. This table remembers which log that is
+-- so later runs fold into it instead of archiving it.
+
+CREATE TABLE IF NOT EXISTS opening_balances (
+    product_id INTEGER PRIMARY KEY,
+    log_id INTEGER NOT NULL,
+
+    CONSTRAINT log_id_check_unique UNIQUE (log_id),
+    CONSTRAINT log_id_check FOREIGN KEY (log_id) REFERENCES inventory_logs(id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+);
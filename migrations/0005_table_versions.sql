@@ -0,0 +1,148 @@
+--------------------
+-- Table versions --
+--------------------
+
+-- Bumped by triggers on every write so that conditional GETs can tell
+-- whether a table changed with one primary-key lookup. Counters start at
+-- a random value so a recreated database never reuses old ETags.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_versions (name, version)
+VALUES
+    ('users', abs(random() >> 16)),
+    ('customers', abs(random() >> 16)),
+    ('categories', abs(random() >> 16)),
+    ('products', abs(random() >> 16)),
+    ('inventory_logs', abs(random() >> 16)),
+    ('sales', abs(random() >> 16)),
+    ('sales_details', abs(random() >> 16));
+
+CREATE TRIGGER IF NOT EXISTS version_insert_users
+AFTER INSERT ON users
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_users
+AFTER UPDATE ON users
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_users
+AFTER DELETE ON users
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_insert_customers
+AFTER INSERT ON customers
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'customers';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_customers
+AFTER UPDATE ON customers
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'customers';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_customers
+AFTER DELETE ON customers
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'customers';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_insert_categories
+AFTER INSERT ON categories
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_categories
+AFTER UPDATE ON categories
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_categories
+AFTER DELETE ON categories
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_insert_products
+AFTER INSERT ON products
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_products
+AFTER UPDATE ON products
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_products
+AFTER DELETE ON products
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_insert_inventory_logs
+AFTER INSERT ON inventory_logs
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'inventory_logs';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_inventory_logs
+AFTER UPDATE ON inventory_logs
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'inventory_logs';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_inventory_logs
+AFTER DELETE ON inventory_logs
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'inventory_logs';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_insert_sales
+AFTER INSERT ON sales
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'sales';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_sales
+AFTER UPDATE ON sales
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'sales';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_sales
+AFTER DELETE ON sales
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'sales';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_insert_sales_details
+AFTER INSERT ON sales_details
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'sales_details';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_sales_details
+AFTER UPDATE ON sales_details
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'sales_details';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_delete_sales_details
+AFTER DELETE ON sales_details
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'sales_details';
+END;
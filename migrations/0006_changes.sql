@@ -0,0 +1,91 @@
+-----------------
+-- Change feed --
+-----------------
+
+-- Append-only record of writes to the tables terminals watch, read by
+-- GET /api/changes. Writers hold the write lock for their whole
+-- transaction, so ids become visible in order and `id > cursor` never
+-- skips a change that commits later.
+
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time INTEGER NOT NULL DEFAULT (unixepoch()),
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    operation TEXT NOT NULL,
+
+    CONSTRAINT operation_check CHECK (operation IN ('i', 'u', 'd'))
+    -- `i`nsert, `u`pdate, `d`elete
+);
+
+-- Keeps the latest 100000 changes, trimmed every 1000 inserts; clients
+-- with an older cursor are told to reload
+CREATE TRIGGER IF NOT EXISTS prune_changes
+AFTER INSERT ON changes
+WHEN NEW.id % 1000 = 0
+BEGIN
+    DELETE FROM changes WHERE id <= NEW.id - 100000;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_insert_products
+AFTER INSERT ON products
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('products', NEW.id, 'i');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_update_products
+AFTER UPDATE ON products
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('products', NEW.id, 'u');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_delete_products
+AFTER DELETE ON products
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('products', OLD.id, 'd');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_insert_inventory_logs
+AFTER INSERT ON inventory_logs
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('inventory_logs', NEW.id, 'i');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_update_inventory_logs
+AFTER UPDATE ON inventory_logs
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('inventory_logs', NEW.id, 'u');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_delete_inventory_logs
+AFTER DELETE ON inventory_logs
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('inventory_logs', OLD.id, 'd');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_insert_sales
+AFTER INSERT ON sales
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('sales', NEW.id, 'i');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_update_sales
+AFTER UPDATE ON sales
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('sales', NEW.id, 'u');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_delete_sales
+AFTER DELETE ON sales
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('sales', OLD.id, 'd');
+END;
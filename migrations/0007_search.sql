@@ -0,0 +1,73 @@
+----------------------
+-- Full-text search --
+----------------------
+
+-- External-content FTS5 indexes over products and customers, kept in sync
+-- by triggers; the text itself stays in the base tables. Two and three
+-- character prefix indexes keep type-ahead queries from walking the whole
+-- term list.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_search USING fts5(
+    name, sku, description,
+    content = 'products', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+
+INSERT INTO products_search (products_search) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS search_insert_product
+AFTER INSERT ON products
+BEGIN
+    INSERT INTO products_search (rowid, name, sku, description)
+    VALUES (NEW.id, NEW.name, NEW.sku, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_delete_product
+AFTER DELETE ON products
+BEGIN
+    INSERT INTO products_search (products_search, rowid, name, sku, description)
+    VALUES ('delete', OLD.id, OLD.name, OLD.sku, OLD.description);
+END;
+
+-- Quantity and price updates leave the index alone
+CREATE TRIGGER IF NOT EXISTS search_update_product
+AFTER UPDATE OF id, name, sku, description ON products
+BEGIN
+    INSERT INTO products_search (products_search, rowid, name, sku, description)
+    VALUES ('delete', OLD.id, OLD.name, OLD.sku, OLD.description);
+
+    INSERT INTO products_search (rowid, name, sku, description)
+    VALUES (NEW.id, NEW.name, NEW.sku, NEW.description);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS customers_search USING fts5(
+    name, email, phone,
+    content = 'customers', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+
+INSERT INTO customers_search (customers_search) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS search_insert_customer
+AFTER INSERT ON customers
+BEGIN
+    INSERT INTO customers_search (rowid, name, email, phone)
+    VALUES (NEW.id, NEW.name, NEW.email, NEW.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_delete_customer
+AFTER DELETE ON customers
+BEGIN
+    INSERT INTO customers_search (customers_search, rowid, name, email, phone)
+    VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_update_customer
+AFTER UPDATE OF id, name, email, phone ON customers
+BEGIN
+    INSERT INTO customers_search (customers_search, rowid, name, email, phone)
+    VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.phone);
+
+    INSERT INTO customers_search (rowid, name, email, phone)
+    VALUES (NEW.id, NEW.name, NEW.email, NEW.phone);
+END;
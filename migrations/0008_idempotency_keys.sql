@@ -0,0 +1,23 @@
+----------------------
+-- Idempotency keys --
+----------------------
+
+-- Responses to POST /api/sales and POST /api/logs by the Idempotency-Key
+-- the client sent, so a retried request is answered from here instead of
+-- writing again. The key is claimed in the same transaction as the writes;
+-- `status` and `body` stay NULL until the response is stored.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    created INTEGER NOT NULL DEFAULT (unixepoch()),
+    status INTEGER,
+    body TEXT,
+
+    PRIMARY KEY (user_id, key),
+    CONSTRAINT user_id_check FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Expired keys are deleted oldest first
+CREATE INDEX IF NOT EXISTS index_idempotency_created ON idempotency_keys(created);
@@ -0,0 +1,18 @@
+--------------------
+-- Filter indexes --
+--------------------
+
+-- Every list filter gets an index whose order matches the order its pages
+-- are keyed on, so a page reads at most `limit` rows past its cursor.
+-- Filtered logs and sales are keyed on (time, id), which the (x, time)
+-- indexes yield for free; other filters keep id order, which a
+-- single-column index yields through its implicit rowid.
+
+CREATE INDEX IF NOT EXISTS index_log_type_time ON inventory_logs(type, time);
+
+CREATE INDEX IF NOT EXISTS index_product_active ON products(active);
+
+CREATE INDEX IF NOT EXISTS index_customer_city ON customers(city);
+CREATE INDEX IF NOT EXISTS index_customer_country ON customers(country);
+
+CREATE INDEX IF NOT EXISTS index_user_role ON users(role);
@@ -0,0 +1,75 @@
+----------------------
+-- Product versions --
+----------------------
+
+-- Sales change product quantities constantly and the rest of the catalog
+-- rarely, so the `products` counter now only moves for catalog writes
+-- (inserts, deletes and updates of any other column) and quantity changes
+-- move `product_stock`. Responses without quantities stay valid through
+-- any number of sales.
+
+INSERT OR IGNORE INTO table_versions (name, version)
+VALUES ('product_stock', abs(random() >> 16));
+
+DROP TRIGGER IF EXISTS version_update_products;
+
+CREATE TRIGGER IF NOT EXISTS version_update_products
+AFTER UPDATE OF id, sku, active, name, price_cents, description, category_id ON products
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS version_update_product_stock
+AFTER UPDATE OF quantity ON products
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'product_stock';
+END;
+
+-- The id of each product's latest change, so a single product's responses
+-- are tagged with its own writes rather than every product's. Maintained
+-- by the change feed triggers, which already record that id.
+
+CREATE TABLE IF NOT EXISTS product_versions (
+    product_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO product_versions (product_id, version)
+SELECT id, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'changes'), 0)
+FROM products;
+
+DROP TRIGGER IF EXISTS change_insert_products;
+DROP TRIGGER IF EXISTS change_update_products;
+DROP TRIGGER IF EXISTS change_delete_products;
+
+CREATE TRIGGER IF NOT EXISTS change_insert_products
+AFTER INSERT ON products
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('products', NEW.id, 'i');
+
+    INSERT INTO product_versions (product_id, version)
+    VALUES (NEW.id, last_insert_rowid())
+    ON CONFLICT (product_id) DO UPDATE SET version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_update_products
+AFTER UPDATE ON products
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('products', NEW.id, 'u');
+
+    DELETE FROM product_versions WHERE product_id = OLD.id AND OLD.id != NEW.id;
+    INSERT INTO product_versions (product_id, version)
+    VALUES (NEW.id, last_insert_rowid())
+    ON CONFLICT (product_id) DO UPDATE SET version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_delete_products
+AFTER DELETE ON products
+BEGIN
+    INSERT INTO changes (table_name, row_id, operation)
+    VALUES ('products', OLD.id, 'd');
+
+    DELETE FROM product_versions WHERE product_id = OLD.id;
+END;
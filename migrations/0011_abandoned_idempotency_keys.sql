@@ -0,0 +1,10 @@
+-----------------------------------
+-- Abandoned idempotency claims --
+-----------------------------------
+
+-- Responses are now stored in the same transaction as the claim, so a
+-- committed claim always has one. Claims whose response was never stored
+-- (the process died between the two writes) would otherwise answer 409
+-- until they expire; they are released so the key can be used again.
+
+DELETE FROM idempotency_keys WHERE status IS NULL;
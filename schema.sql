@@ -36,6 +36,8 @@ CREATE TABLE IF NOT EXISTS customers (
     CONSTRAINT email_check CHECK (email LIKE '%_@__%.__%')
 );
 
+CREATE INDEX IF NOT EXISTS index_customer_email ON customers(email);
+
 ------------------------
 -- Product information --
 ------------------------
@@ -67,6 +69,7 @@ CREATE TABLE IF NOT EXISTS products (
 );
 
 CREATE INDEX IF NOT EXISTS index_sku ON products(sku);
+CREATE INDEX IF NOT EXISTS index_product_category ON products(category_id);
 
 --------------------
 -- Inventory logs --
@@ -86,6 +89,10 @@ CREATE TABLE IF NOT EXISTS inventory_logs (
         ON UPDATE CASCADE ON DELETE SET NULL
 );
 
+-- Per-product history, product filters and the products(id) foreign key
+CREATE INDEX IF NOT EXISTS index_log_product_time ON inventory_logs(product_id, time);
+CREATE INDEX IF NOT EXISTS index_log_time ON inventory_logs(time);
+
 CREATE TRIGGER IF NOT EXISTS insert_quantity_delta
 AFTER INSERT ON inventory_logs
 BEGIN
@@ -131,6 +138,10 @@ CREATE TABLE IF NOT EXISTS sales (
         ON UPDATE CASCADE ON DELETE SET NULL
 );
 
+CREATE INDEX IF NOT EXISTS index_sale_time ON sales(time);
+CREATE INDEX IF NOT EXISTS index_sale_customer_time ON sales(customer_id, time);
+CREATE INDEX IF NOT EXISTS index_sale_user_time ON sales(user_id, time);
+
 CREATE TABLE IF NOT EXISTS sales_details (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     subtotal_cents INTEGER NOT NULL,
@@ -145,6 +156,8 @@ CREATE TABLE IF NOT EXISTS sales_details (
         ON UPDATE CASCADE ON DELETE SET NULL
 );
 
+CREATE INDEX IF NOT EXISTS index_detail_sale ON sales_details(sale_id);
+
 CREATE TRIGGER IF NOT EXISTS insert_subtotal
 AFTER INSERT ON sales_details
 BEGIN
@@ -0,0 +1,43 @@
+from importlib import import_module
+import os
+import tempfile
+
+import pytest
+
+# The app opens (and migrates) its database when imported, so it gets a
+# scratch one, cheap password hashes and no background checkpoints
+directory = tempfile.mkdtemp()
+os.environ["INVENTORY_DB_PATH"] = os.path.join(directory, "db.sqlite")
+os.environ["INVENTORY_DB_ARCHIVE_PATH"] = os.path.join(directory, "db.archive.sqlite")
+os.environ["INVENTORY_DB_BCRYPT_ROUNDS"] = "4"
+os.environ["INVENTORY_DB_CHECKPOINT_INTERVAL"] = "0"
+
+from app import cache  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.pool import ConnectionPool  # noqa: E402
+from app.timing import TimedConnection  # noqa: E402
+
+# The module, not the Flask object the package re-exports under its name
+core = import_module("app.app")
+
+
+@pytest.fixture
+def pool(tmp_path):
+    # A fresh, migrated database the app serves from for one test; cached
+    # responses of earlier tests would carry the same ETags
+    cache.entries.clear()
+    original = core.pool
+    core.pool = ConnectionPool(str(tmp_path / "db.sqlite"), factory=TimedConnection)
+    migrate(core.pool)
+    try:
+        yield core.pool
+    finally:
+        core.pool.close()
+        core.pool = original
+
+
+@pytest.fixture
+def client(pool):
+    client = core.app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "admin"})
+    return client
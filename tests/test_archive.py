@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from app.archive import OPENING_BALANCE_NOTE, archive_logs
+from app.stock import STOCK_AT, create_checkpoint
+
+
+@pytest.fixture
+def db(pool):
+    db = pool.connect()
+    db.execute("INSERT INTO products (name, active, price_cents) VALUES ('Apple', 1, 50), ('Pear', 1, 70);")
+    db.execute("INSERT INTO customers (name) VALUES ('Ada');")
+    db.commit()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def log(db, product_id, delta, at):
+    return db.execute(
+        "INSERT INTO inventory_logs (type, product_id, delta, time) VALUES ('o', ?, ?, ?);",
+        (product_id, delta, at),
+    ).lastrowid
+
+
+def sell(db, product_id, quantity, at):
+    sale_id = db.execute(
+        "INSERT INTO sales (customer_id, user_id, time) VALUES (1, 1, ?);", (at,)
+    ).lastrowid
+    log_id = db.execute(
+        "INSERT INTO inventory_logs (type, product_id, delta, time) VALUES ('s', ?, ?, ?);",
+        (product_id, -quantity, at),
+    ).lastrowid
+    db.execute(
+        "INSERT INTO sales_details (sale_id, log_id, subtotal_cents) VALUES (?, ?, ?);",
+        (sale_id, log_id, 50 * quantity),
+    )
+
+
+def snapshot(db, checkpoints_from):
+    def rows(sql, *args):
+        return [tuple(row) for row in db.execute(sql, args)]
+
+    return {
+        "quantities": rows("SELECT id, quantity FROM products ORDER BY id;"),
+        "rollup": rows("SELECT * FROM sales_rollup WHERE sales_count != 0 ORDER BY 1, 2, 3, 4;"),
+        "product_rollup": rows("SELECT * FROM sales_product_rollup WHERE quantity != 0 ORDER BY 1, 2, 3;"),
+        "checkpoints": rows(
+            "SELECT * FROM stock_checkpoint_items WHERE checkpoint_time >= ? ORDER BY 1, 2;",
+            checkpoints_from,
+        ),
+        "stock": [
+            rows(f"{STOCK_AT} ORDER BY id;", at)
+            for at in range(checkpoints_from, checkpoints_from + 1000, 50)
+        ],
+    }
+
+
+def opening_balances(db):
+    return [
+        tuple(row)
+        for row in db.execute(
+            """
+            SELECT b.product_id, il.delta, il.note
+            FROM opening_balances AS b
+                JOIN inventory_logs AS il ON (il.id = b.log_id)
+            ORDER BY b.product_id;
+            """
+        )
+    ]
+
+
+def test_archiving_keeps_stock_rollups_and_later_checkpoints(db, tmp_path):
+    rng = random.Random(3)
+    log(db, 1, 1000, 0)
+    log(db, 2, 1000, 0)
+    for at in range(1, 2000, 7):
+        if rng.random() < 0.3:
+            sell(db, rng.choice((1, 2)), rng.randint(1, 5), at)
+        else:
+            log(db, rng.choice((1, 2)), rng.randint(-10, 10), at)
+    db.commit()
+    for at in range(100, 2000, 100):
+        assert create_checkpoint(db, at)
+
+    cutoff = 1000
+    newest_archived = db.execute(
+        "SELECT MAX(time) FROM inventory_logs WHERE time < ? AND type != 's';", (cutoff,)
+    ).fetchone()[0]
+    before = snapshot(db, newest_archived)
+    archivable = db.execute(
+        "SELECT COUNT(*) FROM inventory_logs WHERE time < ? AND type != 's';", (cutoff,)
+    ).fetchone()[0]
+
+    # Small batches, so balances are folded into again and again
+    assert archive_logs(db, cutoff, size=25, path=str(tmp_path / "archive.sqlite")) == archivable
+
+    assert snapshot(db, newest_archived) == before
+    assert db.execute(
+        "SELECT COUNT(*) FROM inventory_logs WHERE time < ? AND type NOT IN ('s', 'a');", (cutoff,)
+    ).fetchone()[0] == 0
+
+    db.execute("ATTACH DATABASE ? AS archive;", (str(tmp_path / "archive.sqlite"),))
+    assert db.execute("SELECT COUNT(*) FROM archive.inventory_logs;").fetchone()[0] == archivable
+    db.execute("DETACH DATABASE archive;")
+
+
+def test_later_runs_fold_into_the_opening_balance(db, tmp_path):
+    path = str(tmp_path / "archive.sqlite")
+    log(db, 1, 10, 5)
+    log(db, 1, -4, 15)
+    log(db, 1, 3, 25)
+    db.commit()
+
+    assert archive_logs(db, 10, path=path) == 1
+    assert opening_balances(db) == [(1, 10, OPENING_BALANCE_NOTE)]
+
+    assert archive_logs(db, 30, path=path) == 2
+    assert opening_balances(db) == [(1, 9, OPENING_BALANCE_NOTE)]
+    assert db.execute("SELECT quantity FROM products WHERE id = 1;").fetchone()[0] == 9
+    assert archive_logs(db, 30, path=path) == 0
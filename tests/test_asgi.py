@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from app import asgi
+
+
+async def call(path, body=None, query=b"", headers=(), cookie=None, disconnect=None):
+    headers = [(name.encode(), value.encode()) for name, value in headers]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+
+    scope = {
+        "type": "http",
+        "method": "GET" if body is None else "POST",
+        "path": path,
+        "query_string": query,
+        "headers": headers,
+    }
+    messages = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await (disconnect.wait() if disconnect else asyncio.Event().wait())
+        return {"type": "http.disconnect"}
+
+    response = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode(): value.decode() for name, value in message["headers"]}
+        else:
+            response["body"] += message.get("body", b"")
+
+    await asgi.application(scope, receive, send)
+    return response
+
+
+async def login():
+    response = await call("/api/login", {"username": "admin", "password": "admin"})
+    return response["headers"]["set-cookie"].split(";")[0]
+
+
+def test_idle_clients_share_one_poller(pool, monkeypatch):
+    reads = []
+    read_changes = asgi.read_changes
+    monkeypatch.setattr(asgi, "CHANGES_POLL", 0.02)
+    monkeypatch.setattr(asgi, "read_changes", lambda *args: reads.append(args) or read_changes(*args))
+
+    async def main():
+        cookie = await login()
+        await call("/api/products", {"name": "Apple", "active": True, "price_cents": 50}, cookie=cookie)
+        cursor = json.loads((await call("/api/changes", cookie=cookie))["body"])["cursor"]
+
+        disconnect = asyncio.Event()
+        polls = [call("/api/changes", query=f"after={cursor}&wait=5".encode(), cookie=cookie) for _ in range(20)]
+        streams = [
+            call("/api/changes", headers=[("accept", "text/event-stream")], query=f"after={cursor}".encode(), cookie=cookie, disconnect=disconnect)
+            for _ in range(20)
+        ]
+        waiting = asyncio.gather(*polls, *streams)
+
+        await asyncio.sleep(0.5)
+        idle = len(reads)
+        await call("/api/logs", {"type": "f", "product_id": 1, "delta": 3}, cookie=cookie)
+        await asyncio.sleep(0.2)
+        disconnect.set()
+        return idle, await waiting
+
+    idle, responses = asyncio.run(main())
+
+    # About one read per tick, not one per client per tick
+    assert idle < 0.5 / 0.02 + 40
+    for response in responses[:20]:
+        changes = json.loads(response["body"])["changes"]
+        assert [change["table"] for change in changes] == ["inventory_logs", "products"]
+    for response in responses[20:]:
+        assert response["body"].count(b"event: change") == 2
@@ -0,0 +1,45 @@
+from app import cache
+
+
+def hits(endpoint):
+    return cache.stats[endpoint, "hits"]
+
+
+def sell(client, product_id):
+    response = client.post("/api/logs", json={"type": "s", "product_id": product_id, "delta": -1})
+    assert response.status_code == 201
+
+
+def test_sales_keep_other_products_and_the_catalog_cached(client):
+    for name in ("Apple", "Pear"):
+        client.post("/api/products", json={"name": name, "active": True, "price_cents": 50})
+    client.post("/api/logs", json={"type": "f", "product_id": 1, "delta": 100})
+    client.get("/api/products/2")
+    client.get("/api/products?fields=name,price_cents")
+
+    detail, listing = hits("get_product"), hits("get_products")
+    for _ in range(3):
+        sell(client, 1)
+        assert client.get("/api/products/2").get_json()["name"] == "Pear"
+        assert [item["name"] for item in client.get("/api/products?fields=name,price_cents").get_json()["items"]] == ["Apple", "Pear"]
+
+    assert hits("get_product") == detail + 3
+    assert hits("get_products") == listing + 3
+
+
+def test_quantities_are_never_served_stale(client):
+    client.post("/api/products", json={"name": "Apple", "active": True, "price_cents": 50})
+    client.post("/api/logs", json={"type": "f", "product_id": 1, "delta": 10})
+    etag = client.get("/api/products/1").headers["ETag"]
+
+    sell(client, 1)
+    assert client.get("/api/products/1").get_json()["quantity"] == 9
+    assert client.get("/api/products/1", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/api/products").get_json()["items"][0]["quantity"] == 9
+    assert client.get("/api/products?fields=quantity").get_json()["items"][0]["quantity"] == 9
+    assert client.get("/api/products/search?q=app").get_json()["items"][0]["quantity"] == 9
+
+    # Catalog edits still reach every product
+    client.patch("/api/products/1", json={"name": "Red apple"})
+    assert client.get("/api/products/1").get_json()["name"] == "Red apple"
+    assert client.get("/api/products?fields=name").get_json()["items"][0]["name"] == "Red apple"
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+import threading
+
+import pytest
+
+core = import_module("app.app")
+
+
+@pytest.fixture
+def db(pool):
+    db = pool.connect()
+    db.execute("INSERT INTO products (name, active, price_cents) VALUES ('Apple', 1, 50);")
+    db.commit()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def post_log(client, key, delta=5):
+    return client.post(
+        "/api/logs",
+        json={"type": "f", "product_id": 1, "delta": delta},
+        headers={"Idempotency-Key": key},
+    )
+
+
+def count(db, table):
+    return db.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+
+
+def test_retry_replays_the_stored_response(client, db):
+    first = post_log(client, "k1")
+    retry = post_log(client, "k1")
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert count(db, "inventory_logs") == 1
+
+    # The response committed with the claim, in the same transaction
+    row = db.execute("SELECT status, body FROM idempotency_keys;").fetchone()
+    assert row["status"] == 201 and row["body"] is not None
+
+
+def test_key_reused_for_a_different_request(client, db):
+    post_log(client, "k1")
+    response = post_log(client, "k1", delta=6)
+
+    assert response.status_code == 422
+    assert count(db, "inventory_logs") == 1
+
+
+def test_claim_without_a_response_is_in_flight(client, db):
+    post_log(client, "k1")
+    # As seen while the claiming transaction has not committed its response
+    db.execute("UPDATE idempotency_keys SET status = NULL, body = NULL;")
+    db.commit()
+
+    response = post_log(client, "k1")
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert count(db, "inventory_logs") == 1
+
+
+def test_concurrent_retries_write_once(pool, db):
+    clients = [core.app.test_client() for _ in range(8)]
+    for client in clients:
+        client.post("/api/login", json={"username": "admin", "password": "admin"})
+
+    barrier = threading.Barrier(len(clients))
+
+    def send(client):
+        barrier.wait()
+        return post_log(client, "k1")
+
+    with ThreadPoolExecutor(len(clients)) as executor:
+        responses = list(executor.map(send, clients))
+
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.get_json()["id"] for response in responses}) == 1
+    assert sum("Idempotent-Replayed" not in response.headers for response in responses) == 1
+    assert count(db, "inventory_logs") == 1
+
+
+def test_failed_request_leaves_no_claim(client, db):
+    sale = {"customer_id": 1, "details": [{"product_id": 1, "quantity": 3, "subtotal_cents": 150}]}
+    client.post("/api/customers", json={"name": "Ada"})
+
+    # Not enough stock: nothing is written, the key included
+    response = client.post("/api/sales", json=sale, headers={"Idempotency-Key": "k1"})
+    assert response.status_code == 400
+    assert count(db, "idempotency_keys") == 0
+    assert count(db, "sales") == 0
+
+    post_log(client, "stock")
+    response = client.post("/api/sales", json=sale, headers={"Idempotency-Key": "k1"})
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert count(db, "sales") == 1
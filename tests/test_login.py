@@ -0,0 +1,40 @@
+from importlib import import_module
+
+import bcrypt
+from flask import g
+
+from app import login
+
+core = import_module("app.app")
+
+
+def test_no_connection_is_held_while_hashing(pool, monkeypatch):
+    held = []
+
+    def holding(func):
+        def wrapper(*args):
+            held.append((func.__name__, "db" in g))
+            return func(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(login, "check_password", holding(login.check_password))
+    monkeypatch.setattr(login, "hash_password", holding(login.hash_password))
+    # A hash with a different work factor makes the login rehash it too
+    db = pool.connect()
+    db.execute(
+        "UPDATE users SET password_hash = ? WHERE username = 'admin';",
+        (bcrypt.hashpw(b"admin", bcrypt.gensalt(5)).decode(),),
+    )
+    db.commit()
+    db.close()
+
+    client = core.app.test_client()
+    response = client.post("/api/login", json={"username": "admin", "password": "admin"})
+    assert response.status_code == 200
+    assert held == [("check_password", False), ("hash_password", False)]
+
+    # The rehashed password still works
+    response = client.post("/api/login", json={"username": "admin", "password": "admin"})
+    assert response.status_code == 200
+    assert held[2:] == [("check_password", False)]
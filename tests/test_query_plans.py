@@ -0,0 +1,249 @@
+import json
+import re
+
+import pytest
+
+from app.app import app
+
+
+# Requests replayed against a scratch database; every statement they issue
+# is captured and its query plan checked. String bodies are NDJSON uploads.
+WORKLOAD = [
+    ("post", "/api/categories", {"name": "Produce"}),
+    ("post", "/api/products", {"name": "Apple", "active": True, "price_cents": 50, "sku": "APL", "category_id": 1}),
+    ("post", "/api/products", {"name": "Pear", "active": True, "price_cents": 70, "sku": "PER"}),
+    ("post", "/api/products", {"name": "Plum", "active": True, "price_cents": 90}),
+    ("post", "/api/customers", {"name": "Ada", "email": "ada@example.com"}),
+    ("post", "/api/users", {"username": "cashier", "password": "cashier", "role": "w"}),
+    ("post", "/api/logs", {"type": "f", "product_id": 1, "delta": 100}),
+    ("post", "/api/logs", {"type": "f", "product_id": 2, "delta": 100}),
+    ("patch", "/api/logs/1", {"note": "Initial stock"}),
+    ("post", "/api/sales", {"customer_id": 1, "details": [{"product_id": 1, "quantity": 2, "subtotal_cents": 100}]}),
+    ("post", "/api/sales/batch", {"sales": [{"customer_id": 1, "details": [{"product_id": 2, "quantity": 1, "subtotal_cents": 70}, {"subtotal_cents": 5}]}]}),
+    ("post", "/api/products/import", '{"sku": "APL", "name": "Red apple"}\n{"sku": "KIW", "active": 1, "name": "Kiwi", "price_cents": 30}'),
+    ("post", "/api/customers/import", '{"email": "ada@example.com", "city": "London"}\n{"name": "Bo", "email": "bo@example.com"}'),
+    ("patch", "/api/products/1", {"price_cents": 55}),
+    ("patch", "/api/customers/1", {"phone": "555-0100"}),
+    ("patch", "/api/categories/1", {"description": "Fruit and vegetables"}),
+    ("patch", "/api/users/2", {"role": "r"}),
+    ("get", "/api/products?limit=1", None),
+    ("get", "/api/products?limit=1&after=1", None),
+    ("get", "/api/products?category_id=1", None),
+    ("get", "/api/products?active=1", None),
+    ("get", "/api/products?active=1&category_id=1", None),
+    ("get", "/api/logs?product_id=1", None),
+    ("get", "/api/logs?product_id=1&after=0:0", None),
+    ("get", "/api/logs?time_from=0", None),
+    ("get", "/api/logs?type=f", None),
+    ("get", "/api/logs?type=f&time_from=0&time_to=9999999999", None),
+    ("get", "/api/logs?type=s&product_id=1", None),
+    ("get", "/api/logs?product_id=1&time_from=0&time_to=9999999999", None),
+    ("get", "/api/logs?time_from=0&time_to=9999999999&sort=-time", None),
+    ("get", "/api/logs?sort=time&after=0:0", None),
+    ("get", "/api/sales?customer_id=1", None),
+    ("get", "/api/sales?user_id=1&time_from=0", None),
+    ("get", "/api/sales?user_id=1", None),
+    ("get", "/api/sales?time_from=0&time_to=9999999999", None),
+    ("get", "/api/sales?sort=-time", None),
+    ("get", "/api/sales?expand=details,customer,user,product", None),
+    ("get", "/api/customers", None),
+    ("get", "/api/customers?city=London", None),
+    ("get", "/api/customers?country=UK&after=1", None),
+    ("get", "/api/categories", None),
+    ("get", "/api/users", None),
+    ("get", "/api/users?role=a", None),
+    ("get", "/api/products/1", None),
+    ("get", "/api/logs/1", None),
+    ("get", "/api/sales/1", None),
+    ("get", "/api/sales/1?expand=customer,user,product", None),
+    ("get", "/api/customers/1", None),
+    ("get", "/api/categories/1", None),
+    ("get", "/api/users/1", None),
+    ("get", "/api/products?ids=1,2,99", None),
+    ("get", "/api/customers?ids=1", None),
+    ("get", "/api/categories?ids=1,2", None),
+    ("get", "/api/users?ids=1,2", None),
+    ("get", "/api/logs?ids=1,2", None),
+    ("get", "/api/sales?ids=1,2&expand=details,customer", None),
+    ("post", "/api/products/lookup", {"ids": [1, 2, 3]}),
+    ("post", "/api/customers/lookup", {"ids": [1]}),
+    ("post", "/api/categories/lookup", {"ids": [1]}),
+    ("post", "/api/users/lookup", {"ids": [1, 2]}),
+    ("post", "/api/logs/lookup", {"ids": [1, 2]}),
+    ("post", "/api/sales/lookup", {"ids": [1]}),
+    ("get", "/api/products?fields=name,quantity&after=1", None),
+    ("get", "/api/logs?fields=delta&format=columns&product_id=1", None),
+    ("get", "/api/sales?fields=total_cents&expand=customer", None),
+    ("get", "/api/products/1/stock?at=0", None),
+    ("get", "/api/products/search?q=app", None),
+    ("get", "/api/products/search?q=red+ap&active=1&limit=5", None),
+    ("get", "/api/customers/search?q=ada", None),
+    ("get", "/api/products/stock?category_id=1", None),
+    ("get", "/api/overview", None),
+    ("get", "/api/changes?after=0", None),
+    ("get", "/api/changes", None),
+    ("get", "/api/reports/sales?bucket=hour&from=0&to=9999999999", None),
+    ("get", "/api/reports/sales?bucket=month&group_by=category", None),
+    ("get", "/api/reports/sales?bucket=day&group_by=customer&from=0", None),
+    ("get", "/api/logs/export?since_id=1", None),
+    ("get", "/api/logs/export?since_time=0", None),
+    ("get", "/api/sales/export", None),
+    ("get", "/api/sales/details/export", None),
+    ("get", "/api/sales/details/export?since_time=0", None),
+    ("delete", "/api/sales/1", None),
+    ("delete", "/api/customers/1", None),
+    ("delete", "/api/users/2", None),
+    ("delete", "/api/categories/1", None),
+    ("delete", "/api/products/3", None),
+]
+
+# Statements that read whole tables, or sort every match, on purpose
+ALLOWED_SCANS = [
+    re.compile(pattern)
+    for pattern in (
+        r"^SELECT COUNT\(\*\) FROM users WHERE",  # Startup admin check
+        r"AS stock_value_cents",  # Dashboard aggregates
+        r"^SELECT id, name FROM categories;$",  # Import category map
+        r"FROM (inventory_logs|sales) ORDER BY id;$",  # Full exports
+        r"FROM sales_details AS sd JOIN sales AS s ON \(s.id = sd.sale_id\) ORDER BY sd.id;$",
+        r"^SELECT k, v FROM 'main'\.'\w+_config'$",  # FTS5 reading its settings
+        r"ORDER BY bm25\(",  # Search ranks every match; MATCH bounds them
+    )
+]
+
+SKIPPED = re.compile(r"^(--|PRAGMA|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|CREATE)")
+
+
+def normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def foreign_key_lookups(db):
+    # Deleting or re-keying a parent row makes SQLite look up its children
+    tables = [
+        row[0]
+        for row in db.execute(
+            "SELECT name FROM sqlite_schema WHERE type = 'table' AND name NOT LIKE 'sqlite_%';"
+        )
+    ]
+
+    for table in tables:
+        for fk in db.execute(f"PRAGMA foreign_key_list({table});"):
+            yield f"SELECT 1 FROM {table} WHERE {fk['from']} = 1;"
+
+
+def outer_filter(sql):
+    # What is left of the statement's own WHERE clause once subqueries and
+    # the keyset condition pages start from (`id > 200`) are taken out
+    while (collapsed := re.sub(r"\([^()]*\)", "", sql)) != sql:
+        sql = collapsed
+
+    match = re.search(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|;|$)", sql)
+    if match is None:
+        return ""
+
+    return re.sub(r"(?:\bAND\s+)?\bid [<>] -?\d+(?:\s+AND\b)?", "", match[1]).strip()
+
+
+def plan_problems(db, sql):
+    plan = [row["detail"] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    filtered = outer_filter(sql)
+    # FTS5 tables are always "scanned", through their own index. A rowid
+    # range that is then filtered (a keyset page in id order over an
+    # unindexed filter) is a scan too, just starting mid-table.
+    scans = [
+        detail
+        for detail in plan
+        if detail.startswith("SCAN") and "VIRTUAL TABLE" not in detail
+        or filtered and re.search(r"USING INTEGER PRIMARY KEY \(rowid[<>]\?\)", detail)
+    ]
+    # A page sorted in a temp b-tree had to read every match first
+    paged = " LIMIT " in sql
+    sorts = [detail for detail in plan if "TEMP B-TREE" in detail] if paged else []
+    if not scans and not sorts:
+        return plan, []
+
+    if any(pattern.search(sql) for pattern in ALLOWED_SCANS):
+        return plan, []
+
+    # A scan in index/rowid order that filters nothing stops at its LIMIT
+    if not sorts and paged and not filtered:
+        return plan, []
+
+    return plan, scans + sorts
+
+
+# Statements are checked as traced, with their parameters filled in
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT id FROM inventory_logs WHERE time >= 0 ORDER BY id LIMIT 101;",
+        "SELECT id FROM inventory_logs WHERE type = 'f' ORDER BY id LIMIT 101;",
+        "SELECT id FROM inventory_logs WHERE product_id = 1 ORDER BY id LIMIT 101;",
+        "SELECT id FROM inventory_logs WHERE id > 200 AND note = 'x' ORDER BY id LIMIT 101;",
+        "SELECT id FROM inventory_logs ORDER BY note LIMIT 101;",
+    ],
+)
+def test_unbounded_pages_are_flagged(pool, sql):
+    db = pool.connect()
+    try:
+        assert plan_problems(db, sql)[1]
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT id FROM inventory_logs ORDER BY id LIMIT 101;",
+        "SELECT id FROM inventory_logs WHERE id < 200 ORDER BY id DESC LIMIT 101;",
+        "SELECT id FROM inventory_logs WHERE time >= 0 ORDER BY time, id LIMIT 101;",
+        "SELECT id FROM inventory_logs WHERE type = 'f' AND (time, id) > (0, 0) ORDER BY time, id LIMIT 101;",
+    ],
+)
+def test_bounded_pages_pass(pool, sql):
+    db = pool.connect()
+    try:
+        assert plan_problems(db, sql)[1] == []
+    finally:
+        db.close()
+
+
+def test_query_plans(pool):
+    # Replays WORKLOAD, then checks the plan of every distinct statement it
+    # issued and of the child lookups behind every foreign key
+    statements = []
+
+    def trace(sql):
+        sql = normalize(sql)
+        if not SKIPPED.match(sql):
+            statements.append(sql)
+
+    # Every connection the pool opens from here on is traced
+    pool.setup = lambda db: db.set_trace_callback(trace)
+    client = app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "admin"})
+    for method, url, body in WORKLOAD:
+        if isinstance(body, str):
+            kwargs = {"data": body, "content_type": "application/x-ndjson"}
+        else:
+            kwargs = {"json": body}
+
+        response = getattr(client, method)(url, **kwargs)
+        response.get_data()
+        assert response.status_code < 400, f"{method.upper()} {url}: {response.get_data(as_text=True)}"
+
+    pool.setup = None
+    db = pool.connect()
+    try:
+        checked = list(dict.fromkeys(statements)) + list(foreign_key_lookups(db))
+        failures = []
+        for sql in checked:
+            plan, problems = plan_problems(db, sql)
+            if problems:
+                failures.append(f"{sql}\n    {json.dumps(plan)}")
+    finally:
+        db.close()
+
+    assert len(checked) > 100
+    assert not failures, "Unbounded query plans:\n" + "\n".join(failures)
@@ -0,0 +1,114 @@
+import pytest
+
+DAY = 86400
+
+# The rollups rebuilt from scratch, as the migration backfills them
+SALES = """
+SELECT p.column1, s.time - s.time % p.column2, COALESCE(s.customer_id, 0), COALESCE(s.user_id, 0),
+    COUNT(*), SUM(s.total_cents)
+FROM sales AS s, (VALUES ('h', 3600), ('d', 86400)) AS p
+GROUP BY 1, 2, 3, 4;
+"""
+PRODUCTS = """
+SELECT p.column1, s.time - s.time % p.column2, il.product_id, SUM(-il.delta), SUM(sd.subtotal_cents)
+FROM sales_details AS sd
+    JOIN inventory_logs AS il ON (il.id = sd.log_id)
+    JOIN sales AS s ON (s.id = sd.sale_id),
+    (VALUES ('h', 3600), ('d', 86400)) AS p
+GROUP BY 1, 2, 3;
+"""
+
+
+@pytest.fixture
+def db(pool):
+    db = pool.connect()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def reconcile(db):
+    # Rows that dropped back to zero may linger in the rollups
+    rollup = db.execute(
+        """
+        SELECT period, bucket, customer_id, user_id, sales_count, revenue_cents
+        FROM sales_rollup
+        WHERE sales_count != 0 OR revenue_cents != 0;
+        """
+    ).fetchall()
+    product_rollup = db.execute(
+        """
+        SELECT period, bucket, product_id, quantity, revenue_cents
+        FROM sales_product_rollup
+        WHERE quantity != 0 OR revenue_cents != 0;
+        """
+    ).fetchall()
+
+    assert sorted(map(tuple, rollup)) == sorted(map(tuple, db.execute(SALES)))
+    assert sorted(map(tuple, product_rollup)) == sorted(map(tuple, db.execute(PRODUCTS)))
+
+
+def test_rollups_match_the_sales(client, db):
+    for name in ("Ada", "Grace", "Linus"):
+        client.post("/api/customers", json={"name": name})
+    for name in ("Apple", "Pear"):
+        client.post("/api/products", json={"name": name, "active": True, "price_cents": 50})
+        client.post("/api/logs", json={"type": "f", "product_id": 1 if name == "Apple" else 2, "delta": 1000})
+
+    def line(product_id, quantity):
+        return {"product_id": product_id, "quantity": quantity, "subtotal_cents": 50 * quantity}
+
+    response = client.post(
+        "/api/sales",
+        json={"customer_id": 1, "details": [line(1, 2), line(2, 1), {"subtotal_cents": 300}]},
+    )
+    assert response.status_code == 201
+    reconcile(db)
+
+    start = 1_700_000_000 - 1_700_000_000 % DAY
+    sales = [
+        {"customer_id": 1 + index % 3, "time": start + index * 5000, "details": [line(1 + index % 2, 1 + index % 4)]}
+        for index in range(40)
+    ]
+    results = client.post("/api/sales/batch", json={"sales": sales}).get_json()["results"]
+    assert all("id" in result for result in results)
+    reconcile(db)
+
+    assert client.delete(f"/api/sales/{results[3]['id']}").status_code == 200
+    reconcile(db)
+
+    # Changing a sale line's log moves it between products and quantities
+    log_id = db.execute(
+        "SELECT log_id FROM sales_details WHERE sale_id = ? AND log_id IS NOT NULL;", (results[4]["id"],)
+    ).fetchone()[0]
+    assert client.patch(f"/api/logs/{log_id}", json={"product_id": 2, "delta": -7}).status_code == 200
+    reconcile(db)
+
+    assert client.delete("/api/customers/2").status_code == 200
+    reconcile(db)
+
+    # Moving a sale to another day, and deleting a sale line's log
+    db.execute("UPDATE sales SET time = time + 3 * ? WHERE id = ?;", (DAY, results[5]["id"]))
+    db.commit()
+    reconcile(db)
+
+    log_id = db.execute(
+        "SELECT log_id FROM sales_details WHERE sale_id = ? AND log_id IS NOT NULL;", (results[6]["id"],)
+    ).fetchone()[0]
+    assert client.delete(f"/api/logs/{log_id}").status_code == 200
+    reconcile(db)
+
+    # Sale lines edited and removed on their own
+    details = db.execute(
+        "SELECT id FROM sales_details WHERE sale_id IN (?, ?) ORDER BY id;", (results[8]["id"], results[9]["id"])
+    ).fetchall()
+    db.execute("UPDATE sales_details SET subtotal_cents = 1 WHERE id = ?;", (details[0][0],))
+    db.execute("DELETE FROM sales_details WHERE id = ?;", (details[1][0],))
+    db.commit()
+    reconcile(db)
+
+    # Deleted outright, its lines going with it by cascade
+    db.execute("DELETE FROM sales WHERE id = ?;", (results[7]["id"],))
+    db.commit()
+    reconcile(db)
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.mark.parametrize("body", [[], [{"customer_id": 1}], 7, "sales", True])
+def test_batch_without_an_object_body_is_rejected(client, body):
+    response = client.post("/api/sales/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "A JSON body with a list of sales is required!"
+
+
+def test_batch_rejects_non_integer_fields(client):
+    client.post("/api/customers", json={"name": "Ada"})
+    client.post("/api/products", json={"name": "Apple", "active": True, "price_cents": 50})
+    client.post("/api/logs", json={"type": "f", "product_id": 1, "delta": 10})
+    sale = {"customer_id": 1, "details": [{"product_id": 1, "quantity": 1, "subtotal_cents": 50}]}
+
+    response = client.post(
+        "/api/sales/batch",
+        json={
+            "sales": [
+                sale,
+                {**sale, "details": [{"product_id": 1, "quantity": 1, "subtotal_cents": True}]},
+                {**sale, "details": [{"product_id": "1", "quantity": 1, "subtotal_cents": 50}]},
+                {**sale, "customer_id": True},
+            ]
+        },
+    )
+    results = response.get_json()["results"]
+    assert "id" in results[0]
+    assert results[1]["message"] == "Each subtotal must be an integer number of cents!"
+    assert results[2]["message"] == "Each product must be an integer id!"
+    assert results[3]["message"] == "The customer must be an integer id!"
@@ -0,0 +1,131 @@
+import random
+import threading
+
+import pytest
+
+from app import stock
+from app.stock import STOCK_AT, create_checkpoint
+
+
+@pytest.fixture
+def db(pool):
+    db = pool.connect()
+    db.execute("INSERT INTO products (name, active, price_cents) VALUES ('Apple', 1, 50), ('Pear', 1, 70);")
+    db.commit()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def log(db, product_id, delta, at):
+    db.execute(
+        "INSERT INTO inventory_logs (type, product_id, delta, time) VALUES ('o', ?, ?, ?);",
+        (product_id, delta, at),
+    )
+    db.commit()
+
+
+def stock_at(db, product_id, at):
+    return db.execute(f"{STOCK_AT} WHERE id = :id;", {"at": at, "id": product_id}).fetchone()["quantity"]
+
+
+def ledger_at(db, product_id, at):
+    return db.execute(
+        "SELECT COALESCE(SUM(delta), 0) FROM inventory_logs WHERE product_id = ? AND time <= ?;",
+        (product_id, at),
+    ).fetchone()[0]
+
+
+def item(db, product_id, at):
+    row = db.execute(
+        "SELECT quantity FROM stock_checkpoint_items WHERE product_id = ? AND checkpoint_time = ?;",
+        (product_id, at),
+    ).fetchone()
+    return row and row[0]
+
+
+def test_log_backdated_past_a_checkpoint_without_an_item(db):
+    log(db, 1, 10, 5)
+    assert create_checkpoint(db, 10)
+    assert create_checkpoint(db, 20)
+    # Product 1 has no item at 20, so no trigger folds this log in anywhere
+    log(db, 1, 5, 15)
+    log(db, 1, 1, 25)
+    assert create_checkpoint(db, 30)
+
+    assert item(db, 1, 30) == 16
+    assert [stock_at(db, 1, at) for at in (5, 12, 15, 20, 25, 35)] == [10, 10, 15, 15, 16, 16]
+
+
+def test_logs_changed_after_checkpoints(db):
+    log(db, 1, 10, 5)
+    log(db, 2, 3, 5)
+    assert create_checkpoint(db, 10)
+    log(db, 1, -4, 15)
+    assert create_checkpoint(db, 20)
+
+    # Inserted, moved and deleted behind both checkpoints
+    log(db, 1, 7, 8)
+    db.execute("UPDATE inventory_logs SET time = 12, product_id = 2 WHERE delta = 10;")
+    db.execute("DELETE FROM inventory_logs WHERE delta = -4;")
+    db.commit()
+
+    for at in (5, 8, 10, 12, 15, 20, 30):
+        for product_id in (1, 2):
+            assert stock_at(db, product_id, at) == ledger_at(db, product_id, at), (product_id, at)
+
+
+def test_offline_batches_synced_late(db):
+    # Daily checkpoints while registers upload sales up to three days late
+    rng = random.Random(7)
+    day = 100
+    log(db, 1, 1000, 0)
+    log(db, 2, 1000, 0)
+    for today in range(1, 31):
+        for _ in range(rng.randint(0, 4)):
+            sold = rng.randint(max(0, today - 3) * day, today * day - 1)
+            log(db, rng.choice((1, 2)), rng.randint(-10, 5), sold)
+        assert create_checkpoint(db, today * day)
+
+    for at in range(0, 31 * day, day // 4):
+        for product_id in (1, 2):
+            assert stock_at(db, product_id, at) == ledger_at(db, product_id, at), (product_id, at)
+
+
+def test_checkpoint_at_or_before_the_latest_is_refused(db):
+    assert create_checkpoint(db, 10)
+    assert not create_checkpoint(db, 10)
+    assert not create_checkpoint(db, 5)
+
+
+def test_stock_endpoints(client, db):
+    log(db, 1, 10, 5)
+    assert create_checkpoint(db, 10)
+    log(db, 1, 2, 7)
+
+    assert client.get("/api/products/1/stock?at=8").get_json()["quantity"] == 12
+    assert client.get("/api/products/1/stock?at=4").get_json()["quantity"] == 0
+    assert client.get("/api/products/9/stock").status_code == 404
+
+    page = client.get("/api/products/stock?at=20").get_json()
+    assert [(row["id"], row["quantity"]) for row in page["items"]] == [(1, 12), (2, 0)]
+
+
+def test_checkpoint_thread_starts_with_the_first_request(client, monkeypatch):
+    def checkpointers():
+        return [thread for thread in threading.enumerate() if thread.name == "stock-checkpoints"]
+
+    # Importing the app (as CLI commands and this suite do) starts none
+    assert checkpointers() == []
+
+    stop = threading.Event()
+    monkeypatch.setattr(stock, "CHECKPOINT_INTERVAL", 3600)
+    monkeypatch.setattr(stock, "run_checkpoints", stop.wait)
+    monkeypatch.setattr(stock, "checkpointer", None)
+    try:
+        client.get("/api/products")
+        client.get("/api/products")
+        assert len(checkpointers()) == 1
+    finally:
+        stop.set()
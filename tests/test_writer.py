@@ -0,0 +1,82 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+from importlib import import_module
+import sqlite3
+
+import pytest
+
+from app import writer
+from app.pool import ConnectionPool
+
+core = import_module("app.app")
+
+
+@pytest.fixture
+def db(pool):
+    db = pool.connect()
+    db.execute("INSERT INTO products (name, active, price_cents) VALUES ('Apple', 1, 50);")
+    db.execute("INSERT INTO inventory_logs (type, product_id, delta) VALUES ('f', 1, 10);")
+    db.commit()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def unit(func, *args):
+    return Future(), contextvars.copy_context(), func, args
+
+
+def add_log(db, delta):
+    return db.execute(
+        "INSERT INTO inventory_logs (type, product_id, delta) VALUES ('o', 1, ?);", (delta,)
+    ).lastrowid
+
+
+def deltas(db):
+    return [row[0] for row in db.execute("SELECT delta FROM inventory_logs ORDER BY id;")]
+
+
+def quantity(db):
+    return db.execute("SELECT quantity FROM products WHERE id = 1;").fetchone()[0]
+
+
+def test_failing_unit_is_rolled_back_alone(db):
+    seen = {}
+
+    def look(_):
+        # Earlier units are written but neither committed nor resolved
+        seen["resolved"] = batch[0][0].done()
+        seen["visible"] = deltas(db)
+
+    # The shortage fails the quantity check of the second unit only
+    batch = [unit(add_log, 5), unit(add_log, -100), unit(look), unit(add_log, 2)]
+    writer.commit_batch(batch)
+
+    assert seen == {"resolved": False, "visible": [10]}
+    assert batch[0][0].result() and batch[3][0].result()
+    with pytest.raises(sqlite3.IntegrityError):
+        batch[1][0].result()
+
+    assert deltas(db) == [10, 5, 2]
+    assert quantity(db) == 17
+
+
+def test_transaction_failure_is_shared_by_the_batch(pool, db, monkeypatch):
+    # Gives up on the write lock right away instead of after busy_timeout
+    impatient = ConnectionPool(pool.path, pragmas={"busy_timeout": "50"})
+    monkeypatch.setattr(core, "pool", impatient)
+    try:
+        db.execute("BEGIN IMMEDIATE;")
+        with ThreadPoolExecutor(4) as executor:
+            attempts = [executor.submit(writer.write, add_log, delta) for delta in (1, 2, 3, 4)]
+            for attempt in attempts:
+                with pytest.raises(sqlite3.OperationalError):
+                    attempt.result()
+        db.rollback()
+
+        # The writer keeps going once the database is free again
+        writer.write(add_log, 5)
+        assert deltas(db) == [10, 5]
+    finally:
+        impatient.close()